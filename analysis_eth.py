@@ -2,6 +2,7 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 import os
+from percentile_rank import bbwp, BBWP_LOOKBACK
 
 # Configuration
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
@@ -37,26 +38,156 @@ def load_and_clean_data(filepath):
     
     return df
 
-def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, min_profit_pct=0.0):
+# User specified "Bad Buy" zones - no Daily buys are taken inside these date ranges
+BAD_BUY_ZONES = [
+    ('2021-11-24', '2021-12-30'),
+    ('2024-12-24', '2025-01-20'),
+]
+
+def _signal_inputs(df, timeframe_name, bbwp_range=None, bbwp_lookback=BBWP_LOOKBACK, ema_long=None):
+    """Builds the per-bar numpy arrays the signal loop reads, without touching df."""
+    close = df['close'].to_numpy(dtype=float)
+    k = df['%K'].to_numpy(dtype=float)
+    d = df['%D'].to_numpy(dtype=float)
+    ema21 = df['EMA21'].to_numpy(dtype=float)
+    # ema_long replaces the EMA200 column (e.g. a column of ema_bank.ema_bank)
+    ema200 = df['EMA200'].to_numpy(dtype=float) if ema_long is None else np.asarray(ema_long, dtype=float)
+
+    # Previous bar values (NaN on the first bar, same as shift(1))
+    k_prev = np.concatenate([[np.nan], k[:-1]])
+    d_prev = np.concatenate([[np.nan], d[:-1]])
+
+    inputs = {
+        'close': close,
+        'rsi': df['RSI'].to_numpy(dtype=float),
+        'ema100': df['EMA100'].to_numpy(dtype=float),
+        'ema200': ema200,
+        'stoch_k_18': df['Stoch_K_18'].to_numpy(dtype=float),
+        # Helper for Stoch Cross
+        'stoch_bull_cross': (k > d) & (k_prev <= d_prev),
+        'stoch_bear_cross': (k < d) & (k_prev >= d_prev),
+        # Helper for EMA Cross
+        'above_ema21': close > ema21,
+        'below_ema21': close < ema21,
+        'below_ema200': close < ema200,
+        # EMA Extension
+        'ema_ext_pct': (close - ema200) / ema200 * 100,
+    }
+
+    # Date Exclusion (Daily only)
+    excluded = np.zeros(len(df), dtype=bool)
+    if timeframe_name == "Daily":
+        days = df.index.normalize()
+        for start, end in BAD_BUY_ZONES:
+            excluded |= (days >= start) & (days <= end)
+    inputs['excluded'] = excluded
+
+    # BBWP Filter (buys only allowed while BBWP is inside bbwp_range)
+    bbwp_ok = None
+    if bbwp_range is not None:
+        if bbwp_lookback == BBWP_LOOKBACK and 'BBWP' in df.columns:
+            values = df['BBWP'].to_numpy(dtype=float)
+        else:
+            values = bbwp(close, lookback=bbwp_lookback)
+        bbwp_ok = (values >= bbwp_range[0]) & (values <= bbwp_range[1])
+    inputs['bbwp_ok'] = bbwp_ok
+    return inputs
+
+class CompactSignals:
     """
-    Detects Buy and Sell signals based on sequential logic with state tracking.
+    Low-memory result of detect_signals(..., compact=True).
+
+    Holds signal index arrays and bit-packed Buy/Sell masks. The input frame is referenced,
+    never copied; indicator columns are only computed (as float32) when asked for.
     """
-    
-    df = df.copy()
-    df['Buy_Signal'] = False
-    df['Sell_Signal'] = False
-    
-    # Helper for Stoch Cross
-    df['Stoch_Bull_Cross'] = (df['%K'] > df['%D']) & (df['%K'].shift(1) <= df['%D'].shift(1))
-    df['Stoch_Bear_Cross'] = (df['%K'] < df['%D']) & (df['%K'].shift(1) >= df['%D'].shift(1))
-    
-    # Helper for EMA Cross
-    df['Above_EMA21'] = df['close'] > df['EMA21']
-    df['Below_EMA21'] = df['close'] < df['EMA21']
-    df['Below_EMA200'] = df['close'] < df['EMA200']
-    
-    # EMA Extension
-    df['EMA_Ext_Pct'] = (df['close'] - df['EMA200']) / df['EMA200'] * 100
+    __slots__ = ('_df', 'timeframe_name', '_options', 'buy_idx', 'sell_idx', '_buy_bits', '_sell_bits')
+
+    def __init__(self, df, timeframe_name, buy_idx, sell_idx, options=None):
+        n = len(df)
+        self._df = df
+        self.timeframe_name = timeframe_name
+        self._options = options or {}
+        self.buy_idx = np.asarray(buy_idx, dtype=np.int32)
+        self.sell_idx = np.asarray(sell_idx, dtype=np.int32)
+        self._buy_bits = self._pack(self.buy_idx, n)
+        self._sell_bits = self._pack(self.sell_idx, n)
+
+    @staticmethod
+    def _pack(idx, n):
+        mask = np.zeros(n, dtype=bool)
+        mask[idx] = True
+        return np.packbits(mask)
+
+    def __len__(self):
+        return len(self._df)
+
+    @property
+    def index(self):
+        return self._df.index
+
+    def buy_mask(self):
+        """Unpacks the Buy_Signal column as a bool array."""
+        return np.unpackbits(self._buy_bits, count=len(self)).astype(bool)
+
+    def sell_mask(self):
+        """Unpacks the Sell_Signal column as a bool array."""
+        return np.unpackbits(self._sell_bits, count=len(self)).astype(bool)
+
+    def column(self, name):
+        """Computes one of the helper columns detect_signals would add (floats as float32)."""
+        if name == 'Buy_Signal':
+            return self.buy_mask()
+        if name == 'Sell_Signal':
+            return self.sell_mask()
+        key = COMPACT_COLUMNS[name]
+        values = _signal_inputs(self._df, self.timeframe_name, **self._options)[key]
+        if values.dtype.kind == 'f':
+            return values.astype(np.float32)
+        return values
+
+    def nbytes(self):
+        """Memory held by the result itself (excludes the referenced input frame)."""
+        return self.buy_idx.nbytes + self.sell_idx.nbytes + self._buy_bits.nbytes + self._sell_bits.nbytes
+
+# Helper column name -> key in _signal_inputs
+COMPACT_COLUMNS = {
+    'Stoch_Bull_Cross': 'stoch_bull_cross',
+    'Stoch_Bear_Cross': 'stoch_bear_cross',
+    'Above_EMA21': 'above_ema21',
+    'Below_EMA21': 'below_ema21',
+    'Below_EMA200': 'below_ema200',
+    'EMA_Ext_Pct': 'ema_ext_pct',
+}
+
+# Evaluator state carried from bar to bar (followed by the active_buys tuple)
+SIGNAL_STATE_FIELDS = ('rsi_oversold_bar', 'ema_ext_at_oversold', 'stoch_bull_bar', 'rsi_strong_overbought_bar',
+                       'rsi_weak_overbought_bar', 'stoch_bear_bar_strong', 'stoch_bear_bar_weak', 'last_sell_idx',
+                       'last_signal_idx')
+
+def _evaluate_signals(inputs, timeframe_name, rsi_sell_thresh, min_profit_pct, state=None, start=0, stop=None,
+                      checkpoint_every=0, trace_bar=-1):
+    """
+    Runs the sequential rules of detect_signals over bars [start, stop) of _signal_inputs output.
+
+    state holds the trackers before bar `start` as SIGNAL_STATE_FIELDS values + (active_buys,)
+    (None = fresh start). Returns (events, state, checkpoints, trace):
+      events       [(bar, 'Buy' | 'Sell')] in firing order
+      state        trackers after bar stop - 1
+      checkpoints  [(bar, state before bar)] every checkpoint_every bars (0 = none)
+      trace        state_before and the buy/sell decisions taken on trace_bar (None if not reached)
+    """
+    close_vals = inputs['close']
+    rsi_vals = inputs['rsi']
+    ema_ext_vals = inputs['ema_ext_pct']
+    ema100_vals = inputs['ema100']
+    ema200_vals = inputs['ema200']
+    stoch_k_18 = inputs['stoch_k_18']
+    stoch_bull_cross = inputs['stoch_bull_cross']
+    stoch_bear_cross = inputs['stoch_bear_cross']
+    below_ema21 = inputs['below_ema21']
+    below_ema200 = inputs['below_ema200']
+    excluded = inputs['excluded']
+    bbwp_ok = inputs['bbwp_ok']
 
     # State Trackers
     rsi_oversold_bar = -999
@@ -69,31 +200,52 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
     
     stoch_bear_bar_strong = -999
     stoch_bear_bar_weak = -999
-    
-    signals = []
-    active_buys = [] 
+    last_sell_idx = -999
+    last_signal_idx = -999
+    active_buys = []
+    if state is not None:
+        (rsi_oversold_bar, ema_ext_at_oversold, stoch_bull_bar, rsi_strong_overbought_bar, rsi_weak_overbought_bar,
+         stoch_bear_bar_strong, stoch_bear_bar_weak, last_sell_idx, last_signal_idx) = state[:-1]
+        active_buys = list(state[-1])
+
+    events = []
+    checkpoints = []
+    trace = None
+    if stop is None:
+        stop = len(close_vals)
+
+    for i in range(start, stop):
+        if i == trace_bar or (checkpoint_every and i % checkpoint_every == 0):
+            snapshot = (rsi_oversold_bar, ema_ext_at_oversold, stoch_bull_bar, rsi_strong_overbought_bar,
+                        rsi_weak_overbought_bar, stoch_bear_bar_strong, stoch_bear_bar_weak, last_sell_idx,
+                        last_signal_idx, tuple(active_buys))
+            if checkpoint_every and i % checkpoint_every == 0:
+                checkpoints.append((i, snapshot))
+            if i == trace_bar:
+                trace = {'state_before': snapshot}
 
-    for i in range(len(df)):
         # Current values
-        rsi = df['RSI'].iloc[i]
-        close_price = df['close'].iloc[i]
-        ema_ext = df['EMA_Ext_Pct'].iloc[i]
-        idx = df.index[i]
+        rsi = rsi_vals[i]
+        close_price = close_vals[i]
+        ema_ext = ema_ext_vals[i]
         
         is_buy_setup = False
+        buy_blocked = None
+        sell_rule = None
+        sell_blocked = None
         
         # --- BUY LOGIC ---
         if timeframe_name == "Weekly":
             # User Request: Stoch(18) < 9, Price < EMA200 (or EMA100), RSI < 35
             
             # 1. Check EMA Condition (EMA200 preferred, else EMA100)
-            ema_ref = df['EMA200'].iloc[i]
+            ema_ref = ema200_vals[i]
             if pd.isna(ema_ref):
-                ema_ref = df['EMA100'].iloc[i]
+                ema_ref = ema100_vals[i]
             
             if close_price < ema_ref:
                 # 2. Check Stoch(18) < 9
-                if df['Stoch_K_18'].iloc[i] < 9:
+                if stoch_k_18[i] < 9:
                     # 3. Check RSI < 35
                     if rsi < 35:
                         is_buy_setup = True
@@ -105,7 +257,7 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
                 ema_ext_at_oversold = ema_ext # Capture Ext at the dip
                 
             # 2. Stoch Bull Cross
-            if df['Stoch_Bull_Cross'].iloc[i]:
+            if stoch_bull_cross[i]:
                 if (i - rsi_oversold_bar) <= 20: 
                     stoch_bull_bar = i
             
@@ -117,25 +269,31 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
             
             # Apply Filters (Daily Only)
             if is_buy_setup and timeframe_name == "Daily":
-                # 1. Date Exclusion (User Specified Bad Zones)
-                d_str = str(idx.date())
-                if ('2021-11-24' <= d_str <= '2021-12-30') or \
-                   ('2024-12-24' <= d_str <= '2025-01-20'):
+                # 1. Date Exclusion (User Specified Bad Zones, see BAD_BUY_ZONES)
+                if excluded[i]:
                     is_buy_setup = False
+                    buy_blocked = 'excluded'
                 
                 # 2. Technical Filters
                 if is_buy_setup:
                     # Condition A: Deep Value (Price < EMA200)
-                    if not df['Below_EMA200'].iloc[i]:
+                    if not below_ema200[i]:
                         is_buy_setup = False # Invalid - Strict EMA200 filter requested
+                        buy_blocked = 'not_below_ema200'
                 
+        if is_buy_setup and bbwp_ok is not None and not bbwp_ok[i]:
+            is_buy_setup = False
+            buy_blocked = 'bbwp'
+
         if is_buy_setup:
             # Debounce
-            if not signals or (i - signals[-1]['index_loc'] > 5):
-                 df.at[idx, 'Buy_Signal'] = True
-                 signals.append({'type': 'Buy', 'price': close_price, 'date': idx, 'index_loc': i})
+            if (i - last_signal_idx) > 5:
+                 events.append((i, 'Buy'))
                  active_buys.append(close_price)
                  stoch_bull_bar = -999 
+                 last_signal_idx = i
+            else:
+                 buy_blocked = 'buy_debounce'
 
         # --- SELL LOGIC ---
         sell_candidate = False
@@ -145,12 +303,12 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
             # User Request: Stoch(18) > 82, RSI > 78, Price > 80% above EMA200 (or > 120% above EMA100)
             
             # 1. Check Stoch(18) > 82
-            if df['Stoch_K_18'].iloc[i] > 82:
+            if stoch_k_18[i] > 82:
                 # 2. Check RSI > 78
                 if rsi > 78:
                     # 3. Check EMA Extension
-                    ema200 = df['EMA200'].iloc[i]
-                    ema100 = df['EMA100'].iloc[i]
+                    ema200 = ema200_vals[i]
+                    ema100 = ema100_vals[i]
                     
                     is_ext_valid = False
                     if not pd.isna(ema200):
@@ -162,6 +320,7 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
                             
                     if is_ext_valid:
                         sell_candidate = True
+                        sell_rule = 'weekly'
                         is_extreme_sell = True # Allow naked sell for Weekly tops
                         
         else: # Daily Logic
@@ -169,26 +328,28 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
             if rsi > rsi_sell_thresh:
                 rsi_strong_overbought_bar = i
                 
-            if df['Stoch_Bear_Cross'].iloc[i]:
+            if stoch_bear_cross[i]:
                 stoch_bear_bar_strong = i
             
             # Check for Strong Sell Setup (Stoch Cross within 10 bars of RSI > 80)
             if (i - rsi_strong_overbought_bar) <= 10:
-                if df['Stoch_Bear_Cross'].iloc[i]:
+                if stoch_bear_cross[i]:
                      # REQUIRE EMA Extension > 50% for Strong Sell to avoid early exits
                      if ema_ext > 50.0:
                          sell_candidate = True
+                         sell_rule = 'strong'
 
             # Condition B: Weak Sell (RSI > 65 + Stoch Bear Cross + Price < EMA21)
             if rsi > 65:
                 rsi_weak_overbought_bar = i
                 
-            if df['Stoch_Bear_Cross'].iloc[i]:
+            if stoch_bear_cross[i]:
                 stoch_bear_bar_weak = i
                 
-            if df['Below_EMA21'].iloc[i]:
+            if below_ema21[i]:
                 if (i - stoch_bear_bar_weak) <= 20 and stoch_bear_bar_weak != -999:
                     sell_candidate = True
+                    sell_rule = 'weak'
                     
             # Condition C: Extreme Extension (Blow-off Top) - "Catch tops of 2021 and 2024"
             # Track RSI > 70 for this specific condition
@@ -197,8 +358,9 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
             if ema_ext > 45.0:
                  # Check if we had Extreme RSI recently (within 10 days) AND Stoch Bear Cross NOW
                  if (i - rsi_strong_overbought_bar) <= 10:
-                     if df['Stoch_Bear_Cross'].iloc[i]: 
+                     if stoch_bear_cross[i]: 
                          sell_candidate = True
+                         sell_rule = 'extreme'
                          is_extreme_sell = True
 
         if sell_candidate:
@@ -209,26 +371,73 @@ def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, mi
                     avg_buy_price = sum(active_buys) / len(active_buys)
                     if close_price < (avg_buy_price * (1 + min_profit_pct)):
                         can_sell = False
+                        sell_blocked = 'min_profit'
             elif not is_extreme_sell:
                 # If no position and NOT an extreme sell, we can't sell.
                 can_sell = False
+                sell_blocked = 'no_position'
 
             if can_sell:
                 # Debounce - "sells must be space by 20 days minimum"
-                last_sell_idx = -999
-                for s in reversed(signals):
-                    if s['type'] == 'Sell':
-                        last_sell_idx = s['index_loc']
-                        break
-                
                 if (i - last_sell_idx) > 20:
-                    df.at[idx, 'Sell_Signal'] = True
-                    signals.append({'type': 'Sell', 'price': close_price, 'date': idx, 'index_loc': i})
+                    events.append((i, 'Sell'))
+                    last_sell_idx = i
+                    last_signal_idx = i
                     
                     active_buys = [] 
                     stoch_bear_bar_weak = -999
+                else:
+                    sell_blocked = 'sell_spacing'
+
+        if i == trace_bar:
+            fired = [kind for bar, kind in events[-2:] if bar == i]
+            trace.update({
+                'buy_setup': is_buy_setup or buy_blocked is not None,
+                'buy_blocked': buy_blocked,
+                'bought': 'Buy' in fired,
+                'sell_rule': sell_rule,
+                'sell_blocked': sell_blocked,
+                'sold': 'Sell' in fired,
+            })
+
+    state = (rsi_oversold_bar, ema_ext_at_oversold, stoch_bull_bar, rsi_strong_overbought_bar,
+             rsi_weak_overbought_bar, stoch_bear_bar_strong, stoch_bear_bar_weak, last_sell_idx,
+             last_signal_idx, tuple(active_buys))
+    return events, state, checkpoints, trace
+
+def detect_signals(df, timeframe_name, rsi_buy_thresh=30, rsi_sell_thresh=70, min_profit_pct=0.0, compact=False,
+                   bbwp_range=None, bbwp_lookback=BBWP_LOOKBACK, ema_long=None):
+    """
+    Detects Buy and Sell signals based on sequential logic with state tracking.
+
+    By default returns a copy of df with the signal and helper columns added. With compact=True
+    the input is left untouched and a CompactSignals object is returned in its place.
+    bbwp_range=(lo, hi) only allows buys while BBWP is within [lo, hi]; BBWP is computed from
+    close when bbwp_lookback differs from the exported column's lookback.
+    ema_long (an array aligned with df) replaces EMA200 in every rule, for EMA span sweeps.
+    """
+    options = {'bbwp_range': bbwp_range, 'bbwp_lookback': bbwp_lookback, 'ema_long': ema_long}
+    inputs = _signal_inputs(df, timeframe_name, **options)
+    close_vals = inputs['close']
+    dates = df.index
+
+    events, _, _, _ = _evaluate_signals(inputs, timeframe_name, rsi_sell_thresh, min_profit_pct)
+    signals = [{'type': kind, 'price': close_vals[i], 'date': dates[i], 'index_loc': i} for i, kind in events]
 
     print(f"Detected {len([s for s in signals if s['type']=='Buy'])} Buy and {len([s for s in signals if s['type']=='Sell'])} Sell signals for {timeframe_name}")
+
+    buy_idx = [s['index_loc'] for s in signals if s['type'] == 'Buy']
+    sell_idx = [s['index_loc'] for s in signals if s['type'] == 'Sell']
+    if compact:
+        return CompactSignals(df, timeframe_name, buy_idx, sell_idx, options), signals
+
+    df = df.copy()
+    df['Buy_Signal'] = False
+    df['Sell_Signal'] = False
+    df.iloc[buy_idx, df.columns.get_loc('Buy_Signal')] = True
+    df.iloc[sell_idx, df.columns.get_loc('Sell_Signal')] = True
+    for name, key in COMPACT_COLUMNS.items():
+        df[name] = inputs[key]
     return df, signals
 
 def plot_results(df, signals, timeframe_name):
@@ -11,7 +11,7 @@ def calculate_detailed_stats():
     # Run with optimized parameters: RSI Buy < 35, RSI Sell > 70
     # Note: detect_signals inside analysis_eth.py is ALREADY updated with these hardcoded optimized logic
     # so we just call it directly.
-    df, signals = detect_signals(df, "Daily", rsi_buy_thresh=35, rsi_sell_thresh=70, min_profit_pct=0.25)
+    _, signals = detect_signals(df, "Daily", rsi_buy_thresh=35, rsi_sell_thresh=70, min_profit_pct=0.25, compact=True)
     
     # Process Trades
     trades = []
@@ -0,0 +1,234 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import re
+import time
+from analysis_eth import DATA_DIR, DAILY_FILE, WEEKLY_FILE, calculate_indicators
+
+# Default store location (generated from the CSVs, not committed)
+STORE_DIR = os.path.join(DATA_DIR, "store")
+
+# Every INDEX_STRIDE-th timestamp is kept in the sparse index
+INDEX_STRIDE = 4096
+
+TIME_DTYPE = np.dtype('<i8')
+VALUE_DTYPE = np.dtype('<f8')
+
+def _column_file(name):
+    """File name for a column ('%K' -> 'pct_K.f8', 'Extreme Hi' -> 'Extreme_Hi.f8')."""
+    safe = re.sub(r'[^A-Za-z0-9]+', '_', name.replace('%', 'pct_')).strip('_')
+    return f"{safe}.i8" if name == 'time' else f"{safe}.f8"
+
+class CandleStore:
+    """
+    Append-only columnar candle files for one symbol / timeframe.
+
+    Layout of the directory:
+      meta.json     column list and committed row count (the commit point of every append)
+      <col>.i8/.f8  one fixed-width little-endian file per column ('time' is int64 seconds)
+      index.i8      sparse time index: every INDEX_STRIDE-th timestamp
+
+    Reads return np.memmap views located by binary search on 'time'; nothing is copied.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.meta = None
+        self._maps = {}
+        self._sparse = None
+        self._mapped_rows = -1
+        if os.path.exists(self._meta_path()):
+            self._load_meta()
+
+    def _meta_path(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _load_meta(self):
+        with open(self._meta_path()) as f:
+            self.meta = json.load(f)
+
+    def _write_meta(self):
+        tmp = self._meta_path() + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, self._meta_path())
+
+    @property
+    def columns(self):
+        return [c['name'] for c in self.meta['columns']] if self.meta else []
+
+    def __len__(self):
+        return self.meta['rows'] if self.meta else 0
+
+    def create(self, columns):
+        """Initialises an empty store with the given column names ('time' is required)."""
+        if 'time' not in columns:
+            raise ValueError("Schema must contain a 'time' column")
+        os.makedirs(self.path, exist_ok=True)
+        self.meta = {
+            'columns': [{'name': c, 'file': _column_file(c),
+                         'dtype': (TIME_DTYPE if c == 'time' else VALUE_DTYPE).str} for c in columns],
+            'rows': 0,
+            'index_stride': INDEX_STRIDE,
+        }
+        for c in self.meta['columns']:
+            open(os.path.join(self.path, c['file']), 'wb').close()
+        open(os.path.join(self.path, "index.i8"), 'wb').close()
+        self._write_meta()
+        return self
+
+    def append(self, df):
+        """
+        Appends rows (a DataFrame with a 'time' column in unix seconds, strictly increasing and
+        after the last stored bar). Missing columns are stored as NaN.
+        """
+        if self.meta is None:
+            self.create(list(df.columns))
+        extra = set(df.columns) - set(self.columns)
+        if extra:
+            raise ValueError(f"Columns not in store schema: {sorted(extra)}")
+        if len(df) == 0:
+            return 0
+
+        times = df['time'].to_numpy(dtype=TIME_DTYPE)
+        if np.any(np.diff(times) <= 0):
+            raise ValueError("'time' must be strictly increasing")
+        rows = len(self)
+        if rows and times[0] <= self._time_at(rows - 1):
+            raise ValueError("Appended bars must start after the last stored bar")
+
+        for c in self.meta['columns']:
+            dtype = np.dtype(c['dtype'])
+            if c['name'] in df.columns:
+                values = df[c['name']].to_numpy(dtype=dtype)
+            else:
+                values = np.full(len(df), np.nan, dtype=dtype)
+            col_path = os.path.join(self.path, c['file'])
+            with open(col_path, 'r+b') as f:
+                # Drop bytes of an append that never reached meta.json
+                f.truncate(rows * dtype.itemsize)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(values).tobytes())
+
+        # Sparse index entries for every stride boundary crossed by the new rows
+        stride = self.meta['index_stride']
+        first = -(-rows // stride) * stride
+        positions = np.arange(first, rows + len(df), stride)
+        with open(os.path.join(self.path, "index.i8"), 'r+b') as f:
+            f.truncate((first // stride) * TIME_DTYPE.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(times[positions - rows].astype(TIME_DTYPE).tobytes())
+
+        self.meta['rows'] = rows + len(df)
+        self._write_meta()
+        return len(df)
+
+    def _time_at(self, i):
+        with open(os.path.join(self.path, _column_file('time')), 'rb') as f:
+            f.seek(i * TIME_DTYPE.itemsize)
+            return np.frombuffer(f.read(TIME_DTYPE.itemsize), dtype=TIME_DTYPE)[0]
+
+    def _refresh_maps(self):
+        """(Re)maps the column files when the committed row count changed."""
+        self._load_meta()
+        rows = len(self)
+        if rows == self._mapped_rows:
+            return
+        self._maps = {}
+        for c in self.meta['columns']:
+            if rows:
+                self._maps[c['name']] = np.memmap(os.path.join(self.path, c['file']),
+                                                  dtype=c['dtype'], mode='r', shape=(rows,))
+            else:
+                self._maps[c['name']] = np.empty(0, dtype=c['dtype'])
+        self._sparse = np.fromfile(os.path.join(self.path, "index.i8"), dtype=TIME_DTYPE)
+        self._mapped_rows = rows
+
+    def refresh(self):
+        """Picks up rows appended by another writer."""
+        self._refresh_maps()
+        return self
+
+    def _ensure_maps(self):
+        if self._mapped_rows != len(self):
+            self._refresh_maps()
+
+    def locate(self, t, side='left'):
+        """Row position of timestamp t (unix seconds), as np.searchsorted on 'time' would return."""
+        self._ensure_maps()
+        stride = self.meta['index_stride']
+        # The in-memory sparse index narrows the search to one stride of the mapped column
+        block = np.searchsorted(self._sparse, t, side=side) - 1
+        lo = max(block, 0) * stride
+        hi = min(lo + stride + 1, len(self))
+        return lo + int(np.searchsorted(self._maps['time'][lo:hi], t, side=side))
+
+    def read(self, start=None, end=None, columns=None):
+        """
+        Zero-copy views of the bars with start <= time <= end (unix seconds or anything
+        pd.Timestamp accepts). Returns {column: np.memmap view}.
+        """
+        self._ensure_maps()
+        lo = 0 if start is None else self.locate(_to_seconds(start), 'left')
+        hi = len(self) if end is None else self.locate(_to_seconds(end), 'right')
+        names = self.columns if columns is None else columns
+        return {c: self._maps[c][lo:hi] for c in names}
+
+    def tail(self, n, columns=None):
+        """Zero-copy views of the last n bars."""
+        self._ensure_maps()
+        names = self.columns if columns is None else columns
+        start = max(len(self) - n, 0)
+        return {c: self._maps[c][start:] for c in names}
+
+def _to_seconds(t):
+    """Unix seconds from a number (already seconds) or anything pd.Timestamp accepts."""
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    if isinstance(t, (float, np.floating)):
+        # Kept fractional: searchsorted compares it exactly against the int64 'time' column
+        return float(t)
+    return int(pd.Timestamp(t).timestamp())
+
+def store_path(symbol, timeframe_name, store_dir=STORE_DIR):
+    return os.path.join(store_dir, symbol, timeframe_name)
+
+def views_to_frame(views):
+    """Copies store views into a DataFrame shaped like load_and_clean_data's (with indicators)."""
+    df = pd.DataFrame({c: np.asarray(v) for c, v in views.items()})
+    df['datetime'] = pd.to_datetime(df['time'], unit='s')
+    df.set_index('datetime', inplace=True)
+    return calculate_indicators(df)
+
+def import_csv(filepath, symbol, timeframe_name, store_dir=STORE_DIR):
+    """Appends the bars of a project CSV that are newer than the store's last bar."""
+    store = CandleStore(store_path(symbol, timeframe_name, store_dir))
+    df = pd.read_csv(filepath)
+    if len(store):
+        last = store.tail(1, ['time'])['time'][0]
+        df = df[df['time'] > last]
+    added = store.append(df)
+    print(f"{symbol} {timeframe_name}: {added} bars appended ({len(store)} total)")
+    return store
+
+def main():
+    daily = import_csv(DAILY_FILE, "ETHUSD", "Daily")
+    import_csv(WEEKLY_FILE, "ETHUSD", "Weekly")
+
+    # Last 300 bars (EMA200 warmup + recent history) straight from the mapped files
+    daily.tail(300)
+    start = time.perf_counter()
+    for _ in range(1000):
+        views = daily.tail(300)
+    print(f"tail(300): {(time.perf_counter() - start) / 1000 * 1e6:.1f}us per read, "
+          f"{len(views['close'])} bars, zero-copy: {isinstance(views['close'], np.memmap)}")
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        views = daily.read('2024-12-05', '2024-12-16')
+    print(f"read('2024-12-05', '2024-12-16'): {(time.perf_counter() - start) / 1000 * 1e6:.1f}us per read, "
+          f"{len(views['close'])} bars")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import pandas as pd
+import numpy as np
+import time
+from analysis_eth import load_and_clean_data, detect_signals, DAILY_FILE
+from pivot_scoring import build_pivots
+
+def ema_bank(values, spans, block=16):
+    """
+    EMAs of `values` for many spans at once, as an (n_bars, n_spans) array.
+
+    Same recursion as pandas ewm(span=s, adjust=False).mean(): ema[t] = a*x[t] + (1-a)*ema[t-1]
+    with a = 2 / (s + 1), seeded with the first valid value. Leading NaNs stay NaN; a NaN after
+    the start carries the previous EMA forward (pandas reweights the next value instead).
+
+    The series is cut into blocks of `block` bars. Inside a block the filter is a lower-triangular
+    Toeplitz matrix, so every block and every span is computed by one matmul; only the carry
+    between blocks (n / block steps of a span-sized vector) is sequential.
+    """
+    x = np.asarray(values, dtype=float)
+    spans = np.asarray(spans, dtype=float)
+    alpha = 2.0 / (spans + 1.0)
+    decay = 1.0 - alpha
+    n = len(x)
+
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) == 0:
+        return np.full((n, len(spans)), np.nan)
+    start = valid[0]
+    xs = x[start:]
+    if np.isnan(xs).any():
+        # Gaps after the start: plain recursion, carrying the EMA through NaN bars
+        out = np.full((n, len(spans)), np.nan)
+        row = np.full(len(spans), xs[0])
+        out[start] = row
+        for t in range(1, len(xs)):
+            if xs[t] == xs[t]:
+                row = alpha * xs[t] + decay * row
+            out[start + t] = row
+        return out
+
+    m = len(xs)
+    n_blocks = -(-m // block)
+    padded = np.zeros(n_blocks * block)
+    padded[:m] = xs
+    blocks = padded.reshape(n_blocks, block)
+
+    # Impulse response inside a block, laid out as one (block, block * spans) matrix:
+    # filt[j, i, s] = alpha_s * decay_s^(i - j) for i >= j
+    k = np.arange(block)
+    lag = k[None, :] - k[:, None]
+    powers = decay[None, None, :] ** np.maximum(lag, 0)[:, :, None]
+    filt = np.where((lag >= 0)[:, :, None], alpha[None, None, :] * powers, 0.0)
+
+    # Zero-state response of every block for every span in a single matmul, written straight
+    # into the output buffer (padded to whole blocks; the padding is sliced off on return)
+    buf = np.empty((start + n_blocks * block, len(spans)))
+    buf[:start] = np.nan
+    body = buf[start:].reshape(n_blocks, block * len(spans))
+    np.matmul(blocks, filt.reshape(block, -1), out=body)
+    body = body.reshape(n_blocks, block, len(spans))
+
+    # Add the state carried into each block: ema[c*B + k] += decay^(k+1) * state_c
+    carry = decay[None, :] ** (k[:, None] + 1)  # (block, spans)
+    state = np.full(len(spans), xs[0])  # seeding with x[0] makes ema[0] = x[0]
+    for c in range(n_blocks):
+        body[c] += carry * state
+        state = body[c, -1]
+
+    return buf[:n]
+
+def ema_extension_bank(close, spans):
+    """(close - EMA) / EMA * 100 for every span, shape (n_bars, n_spans)."""
+    close = np.asarray(close, dtype=float)
+    bank = ema_bank(close, spans)
+    return (close[:, None] - bank) / bank * 100
+
+def main():
+    df = load_and_clean_data(DAILY_FILE)
+    if df is None: return
+    close = df['close'].values
+    spans = np.arange(20, 420, 10)
+
+    start = time.perf_counter()
+    bank = ema_bank(close, spans)
+    bank_time = time.perf_counter() - start
+    start = time.perf_counter()
+    df['close'].ewm(span=200, adjust=False).mean()
+    single_time = time.perf_counter() - start
+    ref = df['close'].ewm(span=200, adjust=False).mean().values
+    max_err = np.nanmax(np.abs(bank[:, spans.tolist().index(200)] - ref) / ref)
+    print(f"EMA bank: {len(spans)} spans in {bank_time*1000:.1f}ms (one ewm: {single_time*1000:.1f}ms) | "
+          f"EMA200 max rel diff vs ewm {max_err:.1e}")
+
+    # Which EMA best separates tops from bottoms? Median extension at Extreme Hi vs Extreme Lo
+    ext = ema_extension_bank(close, spans)
+    pivots = build_pivots(df)
+    at_tops = np.nanmedian(ext[pivots['Sell']], axis=0)
+    at_bottoms = np.nanmedian(ext[pivots['Buy']], axis=0)
+    separation = at_tops - at_bottoms
+
+    print("\n--- EMA SPAN SWEEP (median extension at pivots) ---")
+    for k in np.argsort(separation)[::-1][:5]:
+        print(f"EMA{spans[k]:<4} tops {at_tops[k]:+7.1f}% | bottoms {at_bottoms[k]:+7.1f}% | separation {separation[k]:6.1f}")
+
+    # The bank plugs straight into detect_signals as the long EMA
+    print("\n--- DAILY SIGNALS PER LONG EMA ---")
+    for span in (100, 150, 200, 300):
+        k = spans.tolist().index(span)
+        detect_signals(df, "Daily", rsi_buy_thresh=40, rsi_sell_thresh=70, min_profit_pct=0.25,
+                       compact=True, ema_long=bank[:, k])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import pandas as pd
+import numpy as np
+import heapq
+import time
+from analysis_eth import load_and_clean_data, detect_signals, DAILY_FILE
+from forward_returns import signal_locations
+
+# Default cost model
+DEFAULT_COSTS = {
+    'maker_fee': 0.0010,      # 0.10% for resting (limit) orders
+    'taker_fee': 0.0020,      # 0.20% for market orders
+    'slippage_bps': 500,      # Market orders pay 5% of the bar's high-low range
+    'participation': 0.10,    # Max share of a bar's Volume one order may take
+}
+
+# Event kinds. At the same bar orders are processed before fills, fills before cash.
+ORDER = 0
+FILL = 1
+CASH = 2
+
+def run_event_backtest(df, signals, initial_cash=10000.0, buy_fraction=0.10, sell_fraction=1.0,
+                       order_type='market', order_ttl=5, settlement_bars=0, costs=None):
+    """
+    Event-driven backtest of a signals list (from detect_signals or run_backtest).
+
+    Each signal places an order on its bar. Orders, fills and cash settlements are scheduled on
+    a heap keyed by (bar, kind, seq). Market orders fill at close +/- slippage (bps of the bar
+    range) and pay the taker fee; limit orders rest at the signal close, fill when a later bar
+    trades through it and pay the maker fee. Fills are capped at participation * Volume (NaN
+    Volume = unlimited); the remainder carries to the next bar. Unfilled orders are cancelled
+    order_ttl bars after the signal, or as soon as a later signal on the other side arrives. Buys invest buy_fraction of cash, Sells close sell_fraction
+    of the position. Lots are closed FIFO. Sell proceeds can be spent settlement_bars after the
+    fill; until then they count in equity as a receivable.
+    """
+    c = dict(DEFAULT_COSTS)
+    if costs:
+        c.update(costs)
+    maker_fee = c['maker_fee']
+    taker_fee = c['taker_fee']
+    slip_frac = c['slippage_bps'] / 10000.0
+    participation = c['participation']
+
+    close_arr = df['close'].to_numpy(dtype=float)
+    high_arr = df['high'].to_numpy(dtype=float)
+    low_arr = df['low'].to_numpy(dtype=float)
+    volume = df['Volume'].to_numpy(dtype=float) if 'Volume' in df.columns else np.full(len(df), np.nan)
+    n = len(close_arr)
+
+    # Plain lists: indexing them in the event loop is much cheaper than numpy scalars
+    close = close_arr.tolist()
+    high = high_arr.tolist()
+    low = low_arr.tolist()
+    liquidity = np.where(np.isnan(volume), np.inf, volume * participation).tolist()
+    slip = ((high_arr - low_arr) * slip_frac).tolist()
+    is_market = order_type == 'market'
+
+    locs, is_buys = signal_locations(signals)
+    locs = locs.tolist()
+
+    # Event tuples: (bar, kind, seq, a, b, c, d)
+    #   ORDER: a=is_buy, b=remaining qty (None until sized), c=signal bar, d=limit price
+    #   FILL:  a=is_buy, b=qty, c=price, d=fee
+    #   CASH:  a=amount
+    heap = [(loc, ORDER, seq, is_buy, None, loc, close[loc])
+            for seq, (loc, is_buy) in enumerate(zip(locs, is_buys.tolist()))]
+    heapq.heapify(heap)
+    seq = len(heap)
+
+    last_signal = {True: -1, False: -1}  # bar of the latest Buy / Sell signal seen
+    cash = initial_cash
+    coins = 0.0
+    reserved_cash = 0.0   # cost of buy fills scheduled but not yet booked
+    reserved_coins = 0.0  # qty of sell fills scheduled but not yet booked
+    lots = []          # open lots: [qty, price incl. fee per coin, bar]
+    lot_head = 0       # FIFO pointer into lots
+    closed = []        # (entry_bar, exit_bar, qty, entry_price, exit_price)
+    coin_moves = []    # (bar, delta coins)
+    cash_moves = []    # (bar, delta cash incl. receivables)
+    fees_paid = 0.0
+    slippage_cost = 0.0
+    fills = 0
+    partial_fills = 0
+    events = 0
+
+    push = heapq.heappush
+    pop = heapq.heappop
+
+    while heap:
+        bar, kind, _, a, b, sig_bar, d = pop(heap)
+        events += 1
+
+        if kind == ORDER:
+            is_buy = a
+            remaining = b
+            # Signals at a bar pop before orders carried into it (lower seq)
+            if bar == sig_bar:
+                last_signal[is_buy] = bar
+            elif last_signal[not is_buy] > sig_bar:
+                continue
+            price = close[bar]
+            if is_market:
+                price = price + slip[bar] if is_buy else price - slip[bar]
+                fee_rate = taker_fee
+            else:
+                # Limit order rests from the next bar and fills at its price when touched
+                touched = bar > sig_bar and (low[bar] <= d if is_buy else high[bar] >= d)
+                if not touched:
+                    if bar + 1 < n and bar + 1 - sig_bar <= order_ttl:
+                        push(heap, (bar + 1, ORDER, seq, is_buy, remaining, sig_bar, d))
+                        seq += 1
+                    continue
+                price = d
+                fee_rate = maker_fee
+
+            # Size the order the first time it is processed, never beyond what is available
+            if is_buy:
+                affordable = (cash - reserved_cash) / (price * (1 + fee_rate))
+                if remaining is None:
+                    remaining = affordable * buy_fraction
+                elif remaining > affordable:
+                    remaining = affordable
+            else:
+                available = coins - reserved_coins
+                if remaining is None:
+                    remaining = available * sell_fraction
+                elif remaining > available:
+                    remaining = available
+            if remaining <= 0:
+                continue
+
+            qty = remaining if remaining <= liquidity[bar] else liquidity[bar]
+            if qty > 0:
+                fee = qty * price * fee_rate
+                if is_buy:
+                    reserved_cash += qty * price + fee
+                else:
+                    reserved_coins += qty
+                push(heap, (bar, FILL, seq, is_buy, qty, price, fee))
+                seq += 1
+                if qty < remaining:
+                    partial_fills += 1
+            # No liquidity (zero Volume) or a partial fill: carry the rest until order_ttl
+            if qty < remaining and bar + 1 < n and bar + 1 - sig_bar <= order_ttl:
+                push(heap, (bar + 1, ORDER, seq, is_buy, remaining - qty, sig_bar, d))
+                seq += 1
+
+        elif kind == FILL:
+            is_buy, qty, price, fee = a, b, sig_bar, d
+            fills += 1
+            fees_paid += fee
+            if is_market:
+                slippage_cost += qty * slip[bar]
+            if is_buy:
+                cost = qty * price + fee
+                reserved_cash -= cost
+                cash -= cost
+                coins += qty
+                lots.append([qty, cost / qty, bar])
+                coin_moves.append((bar, qty))
+                cash_moves.append((bar, -cost))
+            else:
+                reserved_coins -= qty
+                coins -= qty
+                coin_moves.append((bar, -qty))
+                exit_price = price - fee / qty
+                # Close lots FIFO
+                left = qty
+                while left > 1e-15 and lot_head < len(lots):
+                    lot = lots[lot_head]
+                    take = lot[0] if lot[0] <= left else left
+                    closed.append((lot[2], bar, take, lot[1], exit_price))
+                    lot[0] -= take
+                    left -= take
+                    if lot[0] <= 1e-15:
+                        lot_head += 1
+                proceeds = qty * price - fee
+                cash_moves.append((bar, proceeds))
+                push(heap, (bar + settlement_bars, CASH, seq, proceeds, None, None, None))
+                seq += 1
+
+        else:
+            # Settlement only makes the proceeds spendable; equity booked them at the fill
+            cash += a
+
+    # Equity curve from the ledgers (vectorized)
+    coin_pos = np.zeros(n)
+    cash_pos = np.zeros(n)
+    if coin_moves:
+        bars, deltas = zip(*coin_moves)
+        np.add.at(coin_pos, np.asarray(bars), np.asarray(deltas))
+    if cash_moves:
+        bars, deltas = zip(*cash_moves)
+        np.add.at(cash_pos, np.asarray(bars), np.asarray(deltas))
+    equity = initial_cash + np.cumsum(cash_pos) + np.cumsum(coin_pos) * close_arr
+    peak = np.maximum.accumulate(equity)
+    drawdown = (equity - peak) / peak
+
+    trades = pd.DataFrame(closed, columns=['entry_bar', 'exit_bar', 'qty', 'entry_price', 'exit_price'])
+    if not trades.empty:
+        trades['entry_date'] = df.index[trades['entry_bar'].to_numpy()]
+        trades['exit_date'] = df.index[trades['exit_bar'].to_numpy()]
+        trades['profit_pct'] = trades['exit_price'] / trades['entry_price'] - 1
+
+    final_value = equity[-1] if n else initial_cash
+    return {
+        'final_value': final_value,
+        'total_return': (final_value - initial_cash) / initial_cash,
+        'max_drawdown': drawdown.min() if n else 0.0,
+        'fees_paid': fees_paid,
+        'slippage_cost': slippage_cost,
+        'fills': fills,
+        'partial_fills': partial_fills,
+        'events': events,
+        'open_lots': [lot for lot in lots[lot_head:] if lot[0] > 1e-15],
+        'trades': trades,
+        'equity': pd.Series(equity, index=df.index),
+    }
+
+def print_backtest(result, label):
+    print(f"\n--- {label} ---")
+    print(f"Final Value:   ${result['final_value']:.2f}")
+    print(f"Return:        {result['total_return']*100:.2f}%")
+    print(f"Max Drawdown:  {result['max_drawdown']*100:.2f}%")
+    print(f"Fees Paid:     ${result['fees_paid']:.2f}")
+    print(f"Slippage Cost: ${result['slippage_cost']:.2f}")
+    print(f"Fills:         {result['fills']} ({result['partial_fills']} partial)")
+    print(f"Closed Lots:   {len(result['trades'])}")
+
+def main():
+    print("Loading Data...")
+    df = load_and_clean_data(DAILY_FILE)
+    if df is None: return
+
+    _, signals = detect_signals(df, "Daily", rsi_buy_thresh=35, rsi_sell_thresh=70, min_profit_pct=0.25, compact=True)
+
+    free = run_event_backtest(df, signals, costs={'maker_fee': 0.0, 'taker_fee': 0.0, 'slippage_bps': 0})
+    print_backtest(free, "NO COSTS (fill at close)")
+    market = run_event_backtest(df, signals)
+    print_backtest(market, "MARKET ORDERS (taker fee + slippage)")
+    limit = run_event_backtest(df, signals, order_type='limit')
+    print_backtest(limit, "LIMIT ORDERS (maker fee)")
+
+    # Volume checks: zero-volume bars must carry orders (not fill 0 coins), NaN Volume = unlimited
+    thin = df.copy()
+    thin['Volume'] = np.where(np.arange(len(thin)) % 2 == 0, 0.0, 50.0)
+    print_backtest(run_event_backtest(thin, signals), "MARKET ORDERS (Volume 0 on alternate bars, else 50)")
+    empty = df.copy()
+    empty['Volume'] = np.nan
+    nan_volume = run_event_backtest(empty, signals)
+    print(f"\nNaN Volume matches unlimited liquidity: {np.isclose(nan_volume['final_value'], market['final_value'])}")
+
+    # A Sell cancels what is left of an earlier Buy still carried by the volume cap
+    flat = pd.DataFrame({'close': 100.0, 'high': 101.0, 'low': 99.0, 'Volume': 1.0}, index=df.index[:6])
+    capped = run_event_backtest(flat, [{'type': 'Buy', 'index_loc': 0}, {'type': 'Sell', 'index_loc': 3}])
+    print(f"No buy fills after the Sell: {not capped['open_lots']}")
+
+    # Settlement delays spendable cash, not equity: same curve as instant settlement
+    delayed = run_event_backtest(df, signals, settlement_bars=3)
+    print(f"Settlement leaves equity unchanged: {np.allclose(delayed['equity'], market['equity'])}")
+
+    # Throughput: one buy/sell per bar over the whole history, repeated
+    dense = [{'type': 'Buy' if i % 2 == 0 else 'Sell', 'index_loc': i} for i in range(len(df))] * 50
+    dense.sort(key=lambda s: s['index_loc'])
+    start = time.perf_counter()
+    result = run_event_backtest(df, dense)
+    elapsed = time.perf_counter() - start
+    print(f"\nThroughput: {result['events']} events in {elapsed:.2f}s ({result['events']/elapsed/1e6:.2f}M events/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from analysis_eth import load_and_clean_data, detect_signals, DAILY_FILE
+
+# Horizons (in bars) used when none are given
+DEFAULT_HORIZONS = (7, 30, 90, 180)
+
+def signal_locations(signals):
+    """Returns (index_locs, is_buy) arrays for a signals list from detect_signals or run_backtest."""
+    if not signals:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+    # analysis_eth.py uses 'index_loc', optimize_daily_eth.py uses 'idx'
+    key = 'index_loc' if 'index_loc' in signals[0] else 'idx'
+    locs = np.fromiter((s[key] for s in signals), dtype=np.int64, count=len(signals))
+    is_buy = np.fromiter((s['type'] == 'Buy' for s in signals), dtype=bool, count=len(signals))
+    return locs, is_buy
+
+def forward_windows(close, locs, max_horizon):
+    """
+    Returns an (S, max_horizon + 1) array of closes starting at each signal bar.
+    Bars past the end of the history are NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    # Pad the tail so every signal (even the last bar) owns a full window
+    padded = np.concatenate([close, np.full(max_horizon, np.nan)])
+    # Strided view over the close array - no data is copied until we pick the signal rows
+    windows = sliding_window_view(padded, max_horizon + 1)
+    return windows[locs]
+
+def compute_forward_returns(close, locs, is_buy, horizons=DEFAULT_HORIZONS):
+    """
+    Computes forward return, max favorable (MFE) and max adverse (MAE) excursion
+    for each signal over each horizon.
+
+    Returns a dict of arrays keyed 'ret_{h}', 'mfe_{h}', 'mae_{h}', each of length S.
+    'ret' is the raw price return. MFE / MAE are from the signal's point of view:
+    a Sell is favorable when price falls. Horizons that run past the data are NaN.
+    """
+    horizons = np.asarray(sorted(horizons), dtype=np.int64)
+    locs = np.asarray(locs, dtype=np.int64)
+    is_buy = np.asarray(is_buy, dtype=bool)
+    n = len(close)
+
+    windows = forward_windows(close, locs, int(horizons[-1]))
+    entry = windows[:, :1]
+    rel = windows / entry - 1.0
+
+    # Running extremes along the horizon axis (fmax/fmin skip the NaN padding)
+    run_max = np.fmax.accumulate(rel, axis=1)[:, horizons]
+    run_min = np.fmin.accumulate(rel, axis=1)[:, horizons]
+    ret = rel[:, horizons]
+
+    # Flip excursions for Sell signals
+    mfe = np.where(is_buy[:, None], run_max, -run_min)
+    mae = np.where(is_buy[:, None], run_min, -run_max)
+
+    # Horizons that are not fully inside the history are undefined
+    incomplete = (locs[:, None] + horizons[None, :]) >= n
+    ret[incomplete] = np.nan
+    mfe[incomplete] = np.nan
+    mae[incomplete] = np.nan
+
+    out = {}
+    for j, h in enumerate(horizons):
+        out[f'ret_{h}'] = ret[:, j]
+        out[f'mfe_{h}'] = mfe[:, j]
+        out[f'mae_{h}'] = mae[:, j]
+    return out
+
+def forward_return_table(df, signals, horizons=DEFAULT_HORIZONS):
+    """Returns a DataFrame with one row per signal and forward-return columns."""
+    locs, is_buy = signal_locations(signals)
+    stats = compute_forward_returns(df['close'].values, locs, is_buy, horizons)
+    table = pd.DataFrame({
+        'date': df.index[locs],
+        'type': np.where(is_buy, 'Buy', 'Sell'),
+        'index_loc': locs,
+        'price': df['close'].values[locs],
+    })
+    for col, values in stats.items():
+        table[col] = values
+    return table
+
+def sweep_forward_returns(df, signal_sets, horizons=DEFAULT_HORIZONS):
+    """
+    Forward-return table for many signal lists at once (e.g. every parameter set of an
+    optimizer sweep). signal_sets maps a key (such as a params tuple) to a signals list.
+
+    All signals are evaluated in one pass; bars shared by several sets are computed once.
+    """
+    keys = []
+    all_locs = []
+    all_buys = []
+    for key, signals in signal_sets.items():
+        locs, is_buy = signal_locations(signals)
+        keys.extend([key] * len(locs))
+        all_locs.append(locs)
+        all_buys.append(is_buy)
+
+    if not keys:
+        return pd.DataFrame()
+
+    locs = np.concatenate(all_locs)
+    is_buy = np.concatenate(all_buys)
+
+    # Deduplicate (bar, direction) pairs so each window is only evaluated once
+    pair = locs * 2 + is_buy
+    uniq, inverse = np.unique(pair, return_inverse=True)
+    stats = compute_forward_returns(df['close'].values, uniq // 2, (uniq % 2).astype(bool), horizons)
+
+    table = pd.DataFrame({
+        'set': keys,
+        'date': df.index[locs],
+        'type': np.where(is_buy, 'Buy', 'Sell'),
+        'index_loc': locs,
+    })
+    for col, values in stats.items():
+        table[col] = values[inverse]
+    return table
+
+def summarize_forward_returns(table, horizons=DEFAULT_HORIZONS):
+    """Aggregates a forward-return table per signal type (and per set, if present)."""
+    group_cols = ['set', 'type'] if 'set' in table.columns else ['type']
+    aggs = {'count': ('index_loc', 'size')}
+    for h in sorted(horizons):
+        aggs[f'avg_ret_{h}'] = (f'ret_{h}', 'mean')
+        aggs[f'avg_mfe_{h}'] = (f'mfe_{h}', 'mean')
+        aggs[f'avg_mae_{h}'] = (f'mae_{h}', 'mean')
+    return table.groupby(group_cols).agg(**aggs)
+
+def main():
+    print("Loading Data...")
+    df = load_and_clean_data(DAILY_FILE)
+    if df is None: return
+
+    _, signals = detect_signals(df, "Daily", rsi_buy_thresh=35, rsi_sell_thresh=70, min_profit_pct=0.25, compact=True)
+    table = forward_return_table(df, signals)
+
+    print("\n--- FORWARD RETURNS (DAILY) ---")
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(summarize_forward_returns(table).round(4).T)
+
+    print("\n--- PER SIGNAL ---")
+    for _, row in table.iterrows():
+        parts = " | ".join(f"{h}d {row[f'ret_{h}']*100:7.1f}%" for h in DEFAULT_HORIZONS)
+        print(f"{row['date'].date()} {row['type']:<4} @ {row['price']:8.2f} | {parts}")
+
+if __name__ == "__main__":
+    main()
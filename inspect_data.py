@@ -1,66 +1,160 @@
 import pandas as pd
+import numpy as np
+import argparse
 import os
 
-# Configuration
 # Configuration
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 DAILY_FILE = os.path.join(DATA_DIR, "CRYPTO_ETHUSD, 1D.csv")
 
-def inspect_dates():
-    if not os.path.exists(DAILY_FILE):
-        print(f"Error: File not found at {DAILY_FILE}")
-        return
+DATES_OF_INTEREST = [
+    # User wants to analyze May 10, 2021 to April 12, 2022
+    ('2021-05-10', '2022-04-12', 'Target Sell Zone'),
+
+    # Missed Sells
+    ('2021-11-03', '2021-11-11', 'Missed Sell'),
+    ('2024-05-21', '2024-05-28', 'Missed Sell'),
+    ('2024-12-05', '2024-12-16', 'Missed Sell'),
+    ('2025-08-13', '2025-08-26', 'Missed Sell'),
+    ('2025-10-04', '2025-10-09', 'Missed Sell'),
+
+    # Bad Buys (Don't buy)
+    ('2021-11-24', '2021-12-30', 'Bad Buy Zone'),
+    ('2024-12-24', '2025-01-20', 'Bad Buy Zone')
+]
+
+# Report columns: (header, width)
+REPORT_COLUMNS = [('Date', 12), ('Close', 8), ('RSI', 6), ('EMA200', 8), ('Ext%', 6), ('Stoch Bear', 10)]
 
-    df = pd.read_csv(DAILY_FILE)
+def load_inspection_data(filepath):
+    """Loads a CSV sorted by time and adds the columns used in the inspection report."""
+    if not os.path.exists(filepath):
+        print(f"Error: File not found at {filepath}")
+        return None
+
+    df = pd.read_csv(filepath)
     df['datetime'] = pd.to_datetime(df['time'], unit='s')
     df.set_index('datetime', inplace=True)
-    
+    df.sort_index(inplace=True)
+
     # Helper for Stoch Cross
     df['Stoch_Bull_Cross'] = (df['%K'] > df['%D']) & (df['%K'].shift(1) <= df['%D'].shift(1))
     df['Stoch_Bear_Cross'] = (df['%K'] < df['%D']) & (df['%K'].shift(1) >= df['%D'].shift(1))
     df['Below_EMA200'] = df['close'] < df['EMA200']
+    df['EMA_Ext'] = (df['close'] - df['EMA200']) / df['EMA200'] * 100
+    return df
+
+def window_bounds(index, windows):
+    """
+    Resolves (start, end, label) windows to [lo, hi) row positions with a binary search
+    on the sorted index. Date-only end values include the whole day; hi >= lo always.
+    """
+    starts = pd.to_datetime([w[0] for w in windows])
+    ends = pd.to_datetime([w[1] for w in windows])
+    # A bare date as end means "up to the end of that day" (matters for intraday data)
+    is_date = np.asarray(ends == ends.normalize())
+
+    lo = index.searchsorted(starts, side='left')
+    hi = np.where(is_date,
+                  index.searchsorted(ends + pd.Timedelta(days=1), side='left'),
+                  index.searchsorted(ends, side='right'))
+    lo = np.asarray(lo)
+    # An inverted window (start after end) is empty, not a negative span
+    return lo, np.maximum(hi, lo)
+
+def _format_lines(df, rows):
+    """Formats the report line of each row position in rows, one vectorized pass per column."""
+    sub = df.iloc[rows]
+    # datetime64 -> str casts are much faster than strftime
+    stamps = sub.index.to_numpy()
+    if len(sub) and (sub.index != sub.index.normalize()).any():
+        dates = np.char.replace(stamps.astype('datetime64[m]').astype(str), 'T', ' ')
+    else:
+        dates = stamps.astype('datetime64[D]').astype(str)
+    stoch_bear = np.where(sub['Stoch_Bear_Cross'].to_numpy(), "YES", "")
 
-    dates_of_interest = [
-        # Missed Sells
-        ('2021-11-03', '2021-11-11', 'Missed Sell'),
-        ('2024-05-21', '2024-05-28', 'Missed Sell'),
-        ('2024-12-05', '2024-12-16', 'Missed Sell'),
-        ('2025-08-13', '2025-08-26', 'Missed Sell'),
-        ('2025-10-04', '2025-10-09', 'Missed Sell'),
-        
-        # Bad Buys (Don't buy)
-        ('2021-11-24', '2021-12-30', 'Bad Buy Zone'),
-        ('2024-12-24', '2025-01-20', 'Bad Buy Zone')
+    cols = [
+        np.char.ljust(dates, 12),
+        np.char.mod('%-8.2f', sub['close'].to_numpy()),
+        np.char.mod('%-6.2f', sub['RSI'].to_numpy()),
+        np.char.mod('%-8.2f', sub['EMA200'].to_numpy()),
+        np.char.mod('%-6.2f', sub['EMA_Ext'].to_numpy()),
+        np.char.ljust(stoch_bear.astype(str), 10),
     ]
+    lines = cols[0]
+    for col in cols[1:]:
+        lines = np.char.add(np.char.add(lines, " | "), col)
+    return lines
+
+def format_text_report(df, windows, lo, hi):
+    """Builds the text report. Rows shared by overlapping windows are formatted once."""
+    # Mark every row covered by at least one window (difference array, no per-window masks)
+    cover = np.zeros(len(df) + 1, dtype=np.int64)
+    np.add.at(cover, lo, 1)
+    np.add.at(cover, hi, -1)
+    rows = np.flatnonzero(np.cumsum(cover[:-1]) > 0)
+    # No window has data: every section below is "No data found"
+    lines = _format_lines(df, rows) if len(rows) else np.array([], dtype=str)
+    # Position of each window's first row inside `lines`
+    line_start = np.searchsorted(rows, lo)
+
+    header = " | ".join(f"{name:<{width}}" for name, width in REPORT_COLUMNS)
+    out = []
+    for (start, end, label), a, b, pos in zip(windows, lo, hi, line_start):
+        out.append(f"\n=== {label} ({start} to {end}) ===\n")
+        if a >= b:
+            out.append("No data found\n")
+            continue
+        out.append(header + "\n")
+        out.append("-" * 80 + "\n")
+        out.append("\n".join(lines[pos:pos + (b - a)]) + "\n")
+    return "".join(out)
+
+def window_frame(df, windows, lo, hi):
+    """Stacks all window slices into one frame with the window label/range as columns."""
+    lengths = np.maximum(hi - lo, 0)
+    # Row positions of every window, concatenated without a Python-level loop over rows
+    offsets = np.repeat(lo - np.cumsum(np.append(0, lengths[:-1])), lengths)
+    rows = np.arange(lengths.sum()) + offsets
+    which = np.repeat(np.arange(len(windows)), lengths)
+
+    out = df.iloc[rows][['close', 'RSI', 'EMA200', 'EMA_Ext', 'Stoch_Bear_Cross']].copy()
+    out.insert(0, 'label', np.array([w[2] for w in windows], dtype=object)[which])
+    out.insert(1, 'window_start', np.array([w[0] for w in windows], dtype=object)[which])
+    out.insert(2, 'window_end', np.array([w[1] for w in windows], dtype=object)[which])
+    out.index.name = 'datetime'
+    return out.reset_index()
+
+def inspect_dates(filepath=DAILY_FILE, windows=None, output="detailed_inspection.txt", fmt=None):
+    """Writes the inspection report for all windows to output (txt, csv or json)."""
+    df = load_inspection_data(filepath)
+    if df is None:
+        return
+
+    if windows is None:
+        windows = DATES_OF_INTEREST
+    if fmt is None:
+        fmt = os.path.splitext(output)[1].lstrip('.') or 'txt'
+
+    lo, hi = window_bounds(df.index, windows)
+
+    if fmt == 'txt':
+        with open(output, "w") as f:
+            f.write(format_text_report(df, windows, lo, hi))
+    elif fmt == 'csv':
+        window_frame(df, windows, lo, hi).to_csv(output, index=False)
+    elif fmt == 'json':
+        window_frame(df, windows, lo, hi).to_json(output, orient='records', date_format='iso', indent=2)
+    else:
+        print(f"Error: Unknown format '{fmt}' (expected txt, csv or json)")
+        return
 
-    with open("detailed_inspection.txt", "w") as f:
-        # User wants to analyze May 10, 2021 to April 12, 2022
-        start = '2021-05-10'
-        end = '2022-04-12'
-        label = "Target Sell Zone"
-        
-        f.write(f"\n=== {label} ({start} to {end}) ===\n")
-        mask = (df.index >= start) & (df.index <= end)
-        subset = df.loc[mask]
-        
-        if subset.empty:
-            f.write("No data found\n")
-            return
-
-        # Calculate EMA Extension
-        subset = subset.copy()
-        subset['EMA_Ext'] = (subset['close'] - subset['EMA200']) / subset['EMA200'] * 100
-        
-        # Print header
-        f.write(f"{'Date':<12} | {'Close':<8} | {'RSI':<6} | {'EMA200':<8} | {'Ext%':<6} | {'Stoch Bear':<10}\n")
-        f.write("-" * 80 + "\n")
-        
-        for idx, row in subset.iterrows():
-            date_str = str(idx.date())
-            stoch_bear = "YES" if row['Stoch_Bear_Cross'] else ""
-            f.write(f"{date_str:<12} | {row['close']:<8.2f} | {row['RSI']:<6.2f} | {row['EMA200']:<8.2f} | {row['EMA_Ext']:<6.2f} | {stoch_bear:<10}\n")
-
-    print("Detailed results written to detailed_inspection.txt")
+    print(f"Detailed results for {len(windows)} windows written to {output}")
 
 if __name__ == "__main__":
-    inspect_dates()
+    parser = argparse.ArgumentParser(description="Inspect indicator values over date windows.")
+    parser.add_argument("--file", default=DAILY_FILE, help="CSV file to inspect")
+    parser.add_argument("--output", default="detailed_inspection.txt", help="Report path")
+    parser.add_argument("--format", choices=['txt', 'csv', 'json'], help="Defaults to the output extension")
+    args = parser.parse_args()
+    inspect_dates(args.file, output=args.output, fmt=args.format)
@@ -3,11 +3,19 @@ import numpy as np
 import os
 import itertools
 from analysis_eth import load_and_clean_data, DAILY_FILE
+from pivot_scoring import build_pivots, score_signals
+from event_backtest import run_event_backtest, DEFAULT_COSTS
 
-def run_backtest(df, params):
+# Same event engine with costs switched off, so gross and net returns are comparable
+NO_COSTS = {'maker_fee': 0.0, 'taker_fee': 0.0, 'slippage_bps': 0}
+
+def run_backtest(df, params, pivots=None, costs=None):
     """
     Runs a simplified backtest with specific parameters.
     Returns a dictionary of performance metrics.
+    If pivots (from pivot_scoring.build_pivots) are given, ground-truth scores are added.
+    If costs (see event_backtest.DEFAULT_COSTS) are given, the event backtest's equity return is added
+    without costs ('gross_return') and after fees and slippage ('net_return').
     """
     rsi_buy_thresh = params['rsi_buy']
     rsi_sell_thresh = params['rsi_sell']
@@ -141,7 +149,7 @@ def run_backtest(df, params):
     total_return = sum(closed_trades) # Simple sum of percentages (approximate compounding)
     win_rate = len([p for p in closed_trades if p > 0]) / len(closed_trades) if closed_trades else 0.0
     
-    return {
+    result = {
         'params': params,
         'num_buys': num_buys,
         'num_sells': num_sells,
@@ -149,6 +157,12 @@ def run_backtest(df, params):
         'total_return': total_return,
         'win_rate': win_rate
     }
+    if pivots is not None:
+        result.update(score_signals(df, signals, "Daily", pivots=pivots))
+    if costs is not None:
+        result['gross_return'] = run_event_backtest(df, signals, costs=NO_COSTS)['total_return']
+        result['net_return'] = run_event_backtest(df, signals, costs=costs)['total_return']
+    return result
 
 def optimize():
     print("Loading Data...")
@@ -177,6 +191,9 @@ def optimize():
         'min_profit': [0.15, 0.20, 0.25, 0.30]
     }
     
+    # Ground-truth pivots are extracted once and shared by every combination
+    pivots = build_pivots(df)
+
     keys, values = zip(*param_grid.items())
     combinations = [dict(zip(keys, v)) for v in itertools.product(*values)]
     
@@ -185,7 +202,7 @@ def optimize():
     results = []
     for i, params in enumerate(combinations):
         if i % 50 == 0: print(f"Processing {i}/{len(combinations)}...")
-        res = run_backtest(df, params)
+        res = run_backtest(df, params, pivots, DEFAULT_COSTS)
         results.append(res)
         
     # Sort by Total Return
@@ -195,7 +212,7 @@ def optimize():
     for i in range(5):
         r = results[i]
         p = r['params']
-        print(f"Rank {i+1}: Return {r['total_return']*100:.1f}% | WinRate {r['win_rate']*100:.1f}% | Buys {r['num_buys']} | Sells {r['num_sells']}")
+        print(f"Rank {i+1}: Return {r['total_return']*100:.1f}% | WinRate {r['win_rate']*100:.1f}% | Buys {r['num_buys']} | Sells {r['num_sells']} | F1 {r['f1']:.3f} | Event gross {r['gross_return']*100:.1f}% / net {r['net_return']*100:.1f}%")
         print(f"   Params: RSI Buy < {p['rsi_buy']}, RSI Sell > {p['rsi_sell']}, Ext > {p['ema_ext_sell']}%, Min Profit {p['min_profit']*100}%")
 
 if __name__ == "__main__":
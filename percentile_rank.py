@@ -0,0 +1,102 @@
+import pandas as pd
+import numpy as np
+
+# Defaults that reproduce the BBWP column of the bundled TradingView exports
+BBWP_LENGTH = 8
+BBWP_LOOKBACK = 100
+
+def rolling_count_le(values, window):
+    """
+    For each bar i, counts how many of the previous min(i, window) values are <= values[i].
+
+    All values are known up front, so each one is replaced by its rank among the distinct values
+    and the lookback window is kept as counts per rank in a Fenwick (binary indexed) tree. Each
+    bar is one prefix-sum query plus one insert and one delete, each O(log n): O(n log n) in
+    total, independent of the window length.
+    NaN values count as <= anything (Pine's `na > x` is false), matching TradingView.
+    Returns an int array; bars whose own value is NaN get -1.
+    """
+    values = np.asarray(values, dtype=float)
+    is_nan = np.isnan(values)
+    # NaN is ranked as -inf so it sorts first and is always counted
+    stored = np.where(is_nan, -np.inf, values)
+    distinct = np.unique(stored)
+    ranks = (np.searchsorted(distinct, stored) + 1).tolist()  # 1-based tree positions
+    size = len(distinct)
+    tree = [0] * (size + 1)
+    counts = []
+
+    for i, r in enumerate(ranks):
+        # Window values <= current value = prefix sum over ranks 1..r
+        total = 0
+        j = r
+        while j > 0:
+            total += tree[j]
+            j &= j - 1
+        counts.append(total)
+
+        j = r
+        while j <= size:
+            tree[j] += 1
+            j += j & -j
+        if i >= window:
+            # Drop the value that just left the lookback
+            j = ranks[i - window]
+            while j <= size:
+                tree[j] -= 1
+                j += j & -j
+
+    counts = np.array(counts, dtype=np.int64)
+    counts[is_nan] = -1
+    return counts
+
+def rolling_percentile(values, window):
+    """
+    Percent of the previous min(i, window) values that are <= the current one (0-100).
+    NaN where the current value is NaN or there is no history yet.
+    """
+    counts = rolling_count_le(values, window)
+    sizes = np.minimum(np.arange(len(counts)), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = counts / sizes * 100.0
+    pct[(counts < 0) | (sizes == 0)] = np.nan
+    return pct
+
+def bollinger_band_width(close, length=BBWP_LENGTH, mult=1.0):
+    """(Upper - Lower) / Basis with an SMA basis and population standard deviation."""
+    close = pd.Series(np.asarray(close, dtype=float))
+    basis = close.rolling(length).mean()
+    dev = close.rolling(length).std(ddof=0) * mult
+    return ((2 * dev) / basis).to_numpy()
+
+def bbwp(close, length=BBWP_LENGTH, lookback=BBWP_LOOKBACK):
+    """
+    Bollinger Band Width Percentile: rolling percentile of the band width over `lookback` bars.
+    Matches TradingView's BBWP (NaN for the first `length` bars).
+    """
+    out = rolling_percentile(bollinger_band_width(close, length), lookback)
+    out[:length] = np.nan
+    return out
+
+def main():
+    # Imported here: analysis_eth itself imports this module for the BBWP filter
+    from analysis_eth import load_and_clean_data, DAILY_FILE, WEEKLY_FILE
+
+    for filepath, timeframe_name in ((DAILY_FILE, "Daily"), (WEEKLY_FILE, "Weekly")):
+        df = load_and_clean_data(filepath)
+        if df is None: continue
+
+        computed = bbwp(df['close'].values)
+        expected = df['BBWP'].values
+        both = ~np.isnan(computed) & ~np.isnan(expected)
+        max_err = np.abs(computed[both] - expected[both]).max()
+        nan_match = np.array_equal(np.isnan(computed), np.isnan(expected))
+        print(f"{timeframe_name}: BBWP({BBWP_LENGTH}, {BBWP_LOOKBACK}) vs TradingView column: "
+              f"max abs diff {max_err:.2e} over {both.sum()} bars | NaN positions match: {nan_match}")
+
+        for lookback in (252, 500):
+            pct = bbwp(df['close'].values, lookback=lookback)
+            print(f"   BBWP lookback {lookback}: last value {pct[-1]:.1f}")
+
+if __name__ == "__main__":
+    main()
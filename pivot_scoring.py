@@ -0,0 +1,134 @@
+import pandas as pd
+import numpy as np
+from analysis_eth import load_and_clean_data, detect_signals, DAILY_FILE, WEEKLY_FILE
+from forward_returns import signal_locations
+
+# Bars a signal may be away from a pivot and still count as a hit
+DEFAULT_TOLERANCE = {"Daily": 10, "Weekly": 2}
+
+def _run_extreme(marked, values, pick_max):
+    """Collapses runs of consecutive marked bars into one pivot at the run's extreme value."""
+    locs = np.flatnonzero(marked)
+    if len(locs) == 0:
+        return locs
+    # A new run starts wherever the gap to the previous marked bar is > 1
+    run_starts = np.flatnonzero(np.diff(locs, prepend=-2) > 1)
+    run_ids = np.repeat(np.arange(len(run_starts)), np.diff(np.append(run_starts, len(locs))))
+    v = values[locs]
+    if not pick_max:
+        v = -v
+    # Sort by (run, value) and take the last element of each run -> the extreme
+    order = np.lexsort((v, run_ids))
+    run_ends = np.append(run_starts[1:], len(locs)) - 1
+    return locs[order[run_ends]]
+
+def build_pivots(df, collapse_runs=True):
+    """
+    Extracts ground-truth pivot bar locations from the 'Extreme Hi' / 'Extreme Lo' columns.
+
+    Returns a dict {'Buy': lo_locs, 'Sell': hi_locs} of sorted int arrays. With collapse_runs,
+    each run of consecutive marked bars becomes one pivot at the lowest low / highest high.
+    """
+    hi_marked = df['Extreme Hi'].notna().values
+    lo_marked = df['Extreme Lo'].notna().values
+    if collapse_runs:
+        hi = _run_extreme(hi_marked, df['high'].values, pick_max=True)
+        lo = _run_extreme(lo_marked, df['low'].values, pick_max=False)
+    else:
+        hi = np.flatnonzero(hi_marked)
+        lo = np.flatnonzero(lo_marked)
+    return {'Buy': np.sort(lo), 'Sell': np.sort(hi)}
+
+def match_to_pivots(locs, pivots, tolerance):
+    """
+    Matches each signal location to its nearest pivot using a sorted-index search.
+
+    Returns (pivot_ids, offsets): the index into pivots of the nearest pivot (-1 when none is
+    within tolerance) and the signed timing error in bars (signal - pivot, 0 when unmatched).
+    Cost is O(S log P).
+    """
+    locs = np.asarray(locs, dtype=np.int64)
+    pivots = np.asarray(pivots, dtype=np.int64)
+    if len(pivots) == 0 or len(locs) == 0:
+        return np.full(len(locs), -1, dtype=np.int64), np.zeros(len(locs), dtype=np.int64)
+
+    right = np.searchsorted(pivots, locs)
+    left = np.clip(right - 1, 0, len(pivots) - 1)
+    right = np.clip(right, 0, len(pivots) - 1)
+
+    dist_left = np.abs(locs - pivots[left])
+    dist_right = np.abs(locs - pivots[right])
+    nearest = np.where(dist_right < dist_left, right, left)
+    offsets = locs - pivots[nearest]
+
+    hit = np.abs(offsets) <= tolerance
+    return np.where(hit, nearest, -1), np.where(hit, offsets, 0)
+
+def score_locations(locs, is_buy, pivots, tolerance):
+    """
+    Scores signal locations against pivots from build_pivots.
+
+    Precision is the share of signals within tolerance of a pivot of their side, recall the
+    share of pivots hit by at least one signal. Returns a flat dict so it can be used directly
+    as an optimizer objective.
+    """
+    locs = np.asarray(locs, dtype=np.int64)
+    is_buy = np.asarray(is_buy, dtype=bool)
+    result = {}
+    total_hits = 0
+    total_found = 0
+    total_pivots = 0
+    all_offsets = []
+
+    for side, mask in (('Buy', is_buy), ('Sell', ~is_buy)):
+        side_pivots = pivots[side]
+        ids, offsets = match_to_pivots(locs[mask], side_pivots, tolerance)
+        hit = ids >= 0
+        found = len(np.unique(ids[hit]))
+        n_sig = int(mask.sum())
+
+        result[f'{side.lower()}_precision'] = hit.sum() / n_sig if n_sig else 0.0
+        result[f'{side.lower()}_recall'] = found / len(side_pivots) if len(side_pivots) else 0.0
+
+        total_hits += int(hit.sum())
+        total_found += found
+        total_pivots += len(side_pivots)
+        all_offsets.append(offsets[hit])
+
+    offsets = np.concatenate(all_offsets)
+    precision = total_hits / len(locs) if len(locs) else 0.0
+    recall = total_found / total_pivots if total_pivots else 0.0
+    result['precision'] = precision
+    result['recall'] = recall
+    result['f1'] = 2 * precision * recall / (precision + recall) if (precision + recall) else 0.0
+    result['mean_timing_error'] = float(offsets.mean()) if len(offsets) else 0.0
+    result['mean_abs_timing_error'] = float(np.abs(offsets).mean()) if len(offsets) else 0.0
+    return result
+
+def score_signals(df, signals, timeframe_name="Daily", tolerance=None, pivots=None):
+    """Scores a signals list from detect_signals / run_backtest against the Extreme columns."""
+    if tolerance is None:
+        tolerance = DEFAULT_TOLERANCE.get(timeframe_name, 10)
+    if pivots is None:
+        pivots = build_pivots(df)
+    locs, is_buy = signal_locations(signals)
+    return score_locations(locs, is_buy, pivots, tolerance)
+
+def print_score(score, timeframe_name):
+    print(f"\n--- GROUND TRUTH SCORE ({timeframe_name}) ---")
+    print(f"Precision: {score['precision']*100:.1f}% (Buy {score['buy_precision']*100:.1f}% | Sell {score['sell_precision']*100:.1f}%)")
+    print(f"Recall:    {score['recall']*100:.1f}% (Buy {score['buy_recall']*100:.1f}% | Sell {score['sell_recall']*100:.1f}%)")
+    print(f"F1:        {score['f1']:.3f}")
+    print(f"Timing:    {score['mean_timing_error']:+.1f} bars avg | {score['mean_abs_timing_error']:.1f} bars avg abs")
+
+def main():
+    for filepath, timeframe_name, rsi_sell in ((DAILY_FILE, "Daily", 70), (WEEKLY_FILE, "Weekly", 75)):
+        df = load_and_clean_data(filepath)
+        if df is None: continue
+        _, signals = detect_signals(df, timeframe_name, rsi_buy_thresh=40, rsi_sell_thresh=rsi_sell, min_profit_pct=0.25, compact=True)
+        pivots = build_pivots(df)
+        print(f"{len(pivots['Buy'])} Extreme Lo and {len(pivots['Sell'])} Extreme Hi pivots")
+        print_score(score_signals(df, signals, timeframe_name, pivots=pivots), timeframe_name)
+
+if __name__ == "__main__":
+    main()
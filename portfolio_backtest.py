@@ -0,0 +1,235 @@
+import pandas as pd
+import numpy as np
+import time
+from analysis_eth import load_and_clean_data, detect_signals, DAILY_FILE
+
+# Portfolio rules (same defaults as strategy_optimization.run_strategy)
+DEFAULT_RULES = {
+    'cash_reserve': 0.30,     # Keep 30% of cash when buying
+    'sell_fraction': 0.10,    # Each sell scales out 10% of the position
+    'coin_retention': 0.25,   # Never sell below 25% of the largest position held
+    'max_exposure': 0.25,     # One asset may not exceed 25% of portfolio value after a buy
+    'vol_window': 30,         # Bars of returns for volatility-scaled weights
+    'fee': 0.0,               # Fee per side, fraction of traded value
+}
+
+ALLOCATIONS = ('equal', 'volatility')
+
+# Signal matrix codes. BOTH = Buy and Sell on the same bar, in that order (as detect_signals emits them)
+BUY = 1
+SELL = -1
+BOTH = 2
+
+def align_assets(frames):
+    """
+    Aligns per-asset DataFrames (dict name -> df with a 'close' column) on the union of their
+    indexes. Returns (names, index, close matrix of shape (n_assets, n_bars)); bars before an
+    asset's listing are NaN.
+    """
+    names = list(frames)
+    closes = pd.concat({name: frames[name]['close'] for name in names}, axis=1).sort_index()
+    return names, closes.index, closes.to_numpy(dtype=float).T
+
+def signal_matrix(locs_per_asset, n_bars):
+    """
+    Builds an int8 (n_assets, n_bars) matrix from per-asset (buy_locs, sell_locs):
+    BUY, SELL, BOTH (a Buy and a Sell on the same bar) or 0 = nothing.
+    """
+    signals = np.zeros((len(locs_per_asset), n_bars), dtype=np.int8)
+    for a, (buy_locs, sell_locs) in enumerate(locs_per_asset):
+        buys = np.zeros(n_bars, dtype=bool)
+        sells = np.zeros(n_bars, dtype=bool)
+        buys[buy_locs] = True
+        sells[sell_locs] = True
+        signals[a] = np.select([buys & sells, buys, sells], [BOTH, BUY, SELL], 0)
+    return signals
+
+def _inverse_volatility(close, window):
+    """1 / rolling std of daily returns, (n_assets, n_bars); NaN until the window is full."""
+    returns = pd.DataFrame(close.T).pct_change(fill_method=None)
+    vol = returns.rolling(window).std().to_numpy().T
+    with np.errstate(divide='ignore'):
+        return 1.0 / vol
+
+def run_portfolio_backtest(close, signals, initial_cash=10000.0, allocation='equal', rules=None):
+    """
+    Shared-cash backtest of many assets at once.
+
+    close and signals are aligned (n_assets, n_bars) matrices (signals: BUY, SELL, BOTH, see
+    signal_matrix). On every bar with a signal, all assets are processed together with array ops:
+      - Sells first: each selling asset sells sell_fraction of its coins, but never goes below
+        coin_retention of the largest position it has held. Proceeds return to the shared cash.
+      - Buys: cash * (1 - cash_reserve) is split over the buying assets, equally or in
+        proportion to inverse volatility, then capped so no asset exceeds max_exposure of
+        portfolio value. Budget cut by the cap stays in cash.
+      - Assets with BOTH sell after their buy, keeping the Buy -> Sell order of detect_signals.
+    Bars without signals are only marked to market, and that is done for the whole history at
+    the end from cumulative position changes.
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"allocation must be one of {ALLOCATIONS}")
+    r = dict(DEFAULT_RULES)
+    if rules:
+        r.update(rules)
+
+    close = np.asarray(close, dtype=float)
+    signals = np.asarray(signals)
+    n_assets, n_bars = close.shape
+    # Valuation uses the last known price; assets trade only on bars with a real price
+    marks = pd.DataFrame(close.T).ffill().fillna(0.0).to_numpy().T
+    tradable = ~np.isnan(close)
+    inv_vol = _inverse_volatility(close, r['vol_window']) if allocation == 'volatility' else None
+
+    cash = initial_cash
+    holdings = np.zeros(n_assets)
+    peak_holdings = np.zeros(n_assets)
+    deltas = np.zeros((n_assets, n_bars))   # coin change per asset and bar
+    cash_series = np.zeros(n_bars)           # cash change per bar
+    trade_bars, trade_assets, trade_qty, trade_prices = [], [], [], []
+
+    def _sell(sell, t, price, cash):
+        """Sells sell_fraction of every asset in the sell mask, above the retention floor."""
+        if not sell.any():
+            return cash
+        sellable = np.maximum(holdings[sell] - r['coin_retention'] * peak_holdings[sell], 0.0)
+        qty = np.minimum(holdings[sell] * r['sell_fraction'], sellable)
+        holdings[sell] -= qty
+        deltas[sell, t] -= qty
+        trade_bars.append(np.full(int(sell.sum()), t))
+        trade_assets.append(np.flatnonzero(sell))
+        trade_qty.append(-qty)
+        trade_prices.append(price[sell])
+        return cash + float(np.sum(qty * price[sell])) * (1 - r['fee'])
+
+    active = np.flatnonzero((signals != 0).any(axis=0))
+    for t in active:
+        sig = signals[:, t]
+        price = close[:, t]
+        ok = tradable[:, t]
+        cash_before = cash
+
+        # Sells (vectorized over assets); same-bar Buy+Sell assets sell after buying
+        cash = _sell(ok & (sig == SELL) & (holdings > 0), t, price, cash)
+
+        # Buys (vectorized over assets)
+        buy = ok & ((sig == BUY) | (sig == BOTH))
+        if buy.any():
+            budget = cash * (1 - r['cash_reserve'])
+            if allocation == 'equal':
+                weights = np.full(int(buy.sum()), 1.0)
+            else:
+                weights = inv_vol[buy, t]
+                # Assets without enough history get the average weight of the others
+                known = np.isfinite(weights)
+                weights = np.where(known, weights, weights[known].mean() if known.any() else 1.0)
+            alloc = budget * weights / weights.sum()
+
+            position_value = holdings[buy] * price[buy]
+            equity = cash + float(np.dot(holdings[ok], price[ok])) + float(np.dot(holdings[~ok], marks[~ok, t]))
+            alloc = np.minimum(alloc, np.maximum(r['max_exposure'] * equity - position_value, 0.0))
+
+            qty = alloc * (1 - r['fee']) / price[buy]
+            holdings[buy] += qty
+            np.maximum(peak_holdings, holdings, out=peak_holdings)
+            deltas[buy, t] += qty
+            cash -= float(alloc.sum())
+            trade_bars.append(np.full(int(buy.sum()), t))
+            trade_assets.append(np.flatnonzero(buy))
+            trade_qty.append(qty)
+            trade_prices.append(price[buy])
+
+        cash = _sell(ok & (sig == BOTH) & (holdings > 0), t, price, cash)
+        cash_series[t] = cash - cash_before
+
+    # Mark to market every bar from cumulative changes
+    positions = np.cumsum(deltas, axis=1)
+    cash_curve = initial_cash + np.cumsum(cash_series)
+    equity = cash_curve + np.sum(positions * marks, axis=0)
+    peak = np.maximum.accumulate(equity)
+    drawdown = (equity - peak) / peak
+
+    if trade_bars:
+        trades = pd.DataFrame({
+            'bar': np.concatenate(trade_bars),
+            'asset': np.concatenate(trade_assets),
+            'qty': np.concatenate(trade_qty),
+            'price': np.concatenate(trade_prices),
+        }).sort_values(['bar', 'asset'], kind='stable', ignore_index=True)
+    else:
+        trades = pd.DataFrame(columns=['bar', 'asset', 'qty', 'price'])
+
+    final_value = equity[-1] if n_bars else initial_cash
+    return {
+        'final_value': final_value,
+        'total_return': (final_value - initial_cash) / initial_cash,
+        'max_drawdown': drawdown.min() if n_bars else 0.0,
+        'equity': equity,
+        'cash': cash_curve,
+        'positions': positions,
+        'exposure': positions * marks / equity,
+        'trades': trades,
+    }
+
+def print_portfolio(result, label, names=None):
+    print(f"\n--- {label} ---")
+    print(f"Final Value:   ${result['final_value']:.2f}")
+    print(f"Return:        {result['total_return']*100:.2f}%")
+    print(f"Max Drawdown:  {result['max_drawdown']*100:.2f}%")
+    print(f"Trades:        {len(result['trades'])}")
+    print(f"Final Cash:    ${result['cash'][-1]:.2f}")
+    print(f"Max Exposure:  {np.nanmax(result['exposure'])*100:.1f}% of portfolio in one asset")
+    if names is not None:
+        final = result['exposure'][:, -1]
+        for a in np.argsort(final)[::-1][:5]:
+            if final[a] > 0:
+                print(f"   {names[a]:<10} {final[a]*100:5.1f}%")
+
+def synthetic_basket(n_assets, n_bars, seed=0):
+    """Random-walk closes (with staggered listings) and EMA200 zone-entry signals, for timing."""
+    rng = np.random.default_rng(seed)
+    vol = rng.uniform(0.02, 0.06, size=(n_assets, 1))
+    log_ret = rng.normal(0.0, 1.0, size=(n_assets, n_bars)) * vol
+    close = 100 * np.exp(np.cumsum(log_ret, axis=1))
+    listing = rng.integers(0, n_bars // 3, size=n_assets)
+    close[np.arange(n_bars)[None, :] < listing[:, None]] = np.nan
+
+    # run_strategy's zones: buy below 70% of EMA200, sell above 140%; signal on entering a zone
+    ema200 = pd.DataFrame(close.T).ewm(span=200, adjust=False).mean().to_numpy().T
+    ratio = close / ema200
+    in_buy = ratio < 0.70
+    in_sell = ratio > 1.40
+    signals = np.zeros((n_assets, n_bars), dtype=np.int8)
+    signals[:, 1:][in_buy[:, 1:] & ~in_buy[:, :-1]] = BUY
+    signals[:, 1:][in_sell[:, 1:] & ~in_sell[:, :-1]] = SELL
+    signals[:, :200] = 0
+    return close, signals
+
+def main():
+    print("Loading Data...")
+    df = load_and_clean_data(DAILY_FILE)
+    if df is None: return
+
+    # Two ETH sleeves (sells need +25% over the average buy vs. any profit) drawing on one cash balance
+    frames = {'ETH mp25': df, 'ETH mp0': df}
+    names, index, close = align_assets(frames)
+    locs = []
+    for min_profit in (0.25, 0.0):
+        compact, _ = detect_signals(df, "Daily", rsi_sell_thresh=70, min_profit_pct=min_profit, compact=True)
+        locs.append((compact.buy_idx, compact.sell_idx))
+    signals = signal_matrix(locs, len(index))
+    result = run_portfolio_backtest(close, signals, rules={'max_exposure': 1.0})
+    print_portfolio(result, "ETH SLEEVES (equal weight, shared cash)", names)
+
+    # Throughput: 200 assets x 10 years of daily bars
+    n_assets, n_bars = 200, 3650
+    close, signals = synthetic_basket(n_assets, n_bars)
+    names = [f"ASSET{a:03d}" for a in range(n_assets)]
+    for allocation in ALLOCATIONS:
+        start = time.perf_counter()
+        result = run_portfolio_backtest(close, signals, allocation=allocation)
+        elapsed = time.perf_counter() - start
+        print_portfolio(result, f"SYNTHETIC {n_assets} ASSETS x {n_bars} BARS ({allocation})", names)
+        print(f"Elapsed:       {elapsed:.3f}s")
+
+if __name__ == "__main__":
+    main()
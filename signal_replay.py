@@ -0,0 +1,232 @@
+import pandas as pd
+import numpy as np
+import argparse
+import time
+from analysis_eth import (load_and_clean_data, _signal_inputs, _evaluate_signals, SIGNAL_STATE_FIELDS,
+                          BBWP_LOOKBACK, DAILY_FILE, WEEKLY_FILE)
+
+# Bars between state snapshots: a query replays at most this many bars
+CHECKPOINT_EVERY = 64
+
+# Tracker values of one snapshot (active_buys is stored separately, see SignalReplay)
+STATE_DTYPE = np.dtype([(name, 'f8' if name == 'ema_ext_at_oversold' else 'i8') for name in SIGNAL_STATE_FIELDS])
+
+# Values shown for a bar -> key in _signal_inputs
+INDICATORS = {
+    'close': 'close',
+    'RSI': 'rsi',
+    'EMA200': 'ema200',
+    'EMA100': 'ema100',
+    'EMA_Ext_Pct': 'ema_ext_pct',
+    'Stoch_K_18': 'stoch_k_18',
+    'Stoch_Bull_Cross': 'stoch_bull_cross',
+    'Stoch_Bear_Cross': 'stoch_bear_cross',
+    'Below_EMA21': 'below_ema21',
+    'Below_EMA200': 'below_ema200',
+    'Excluded_Zone': 'excluded',
+    'BBWP_OK': 'bbwp_ok',
+}
+
+BLOCK_REASONS = {
+    'excluded': "inside a BAD_BUY_ZONES range",
+    'not_below_ema200': "close is not below EMA200",
+    'bbwp': "BBWP outside bbwp_range",
+    'buy_debounce': "within 5 bars of the previous signal",
+    'min_profit': "close below average buy price * (1 + min_profit_pct)",
+    'no_position': "no open buys and not an extreme sell",
+    'sell_spacing': "within 20 bars of the previous sell",
+}
+
+SELL_RULES = {
+    'strong': "RSI > rsi_sell_thresh in the last 10 bars + Stoch bear cross + EMA extension > 50%",
+    'weak': "close < EMA21 within 20 bars of a Stoch bear cross",
+    'extreme': "EMA extension > 45% + RSI > 70 in the last 10 bars + Stoch bear cross",
+    'weekly': "Stoch(18) > 82 + RSI > 78 + 80% above EMA200 (120% above EMA100)",
+}
+
+class SignalReplay:
+    """
+    Point-in-time view of detect_signals.
+
+    One pass over the history records the evaluator state every checkpoint_every bars: the
+    trackers as a structured array and active_buys as one flat array with offsets. Any bar can
+    then be reconstructed by replaying at most checkpoint_every bars from the nearest snapshot.
+    Indicator inputs are computed once and kept, so their values at any bar are a lookup.
+    """
+
+    def __init__(self, df, timeframe_name, rsi_sell_thresh=70, min_profit_pct=0.0, bbwp_range=None,
+                 bbwp_lookback=BBWP_LOOKBACK, ema_long=None, checkpoint_every=CHECKPOINT_EVERY):
+        if checkpoint_every < 1:
+            raise ValueError("checkpoint_every must be at least 1 (bar 0 always needs a snapshot)")
+        self.index = df.index
+        self.timeframe_name = timeframe_name
+        self.rsi_sell_thresh = rsi_sell_thresh
+        self.min_profit_pct = min_profit_pct
+        self.checkpoint_every = checkpoint_every
+        self.inputs = _signal_inputs(df, timeframe_name, bbwp_range=bbwp_range,
+                                     bbwp_lookback=bbwp_lookback, ema_long=ema_long)
+
+        events, _, checkpoints, _ = self._run(checkpoint_every=checkpoint_every)
+        self.events = events
+        self.checkpoint_bars = np.array([bar for bar, _ in checkpoints], dtype=np.int64)
+        self.trackers = np.array([state[:-1] for _, state in checkpoints], dtype=STATE_DTYPE)
+        buys = [state[-1] for _, state in checkpoints]
+        self.buy_offsets = np.concatenate([[0], np.cumsum([len(b) for b in buys])]).astype(np.int64)
+        self.buy_prices = np.array([p for b in buys for p in b], dtype=float)
+
+    def _run(self, **kwargs):
+        return _evaluate_signals(self.inputs, self.timeframe_name, self.rsi_sell_thresh, self.min_profit_pct, **kwargs)
+
+    def nbytes(self):
+        """Memory held by the snapshots."""
+        return self.checkpoint_bars.nbytes + self.trackers.nbytes + self.buy_offsets.nbytes + self.buy_prices.nbytes
+
+    def bar_at(self, when):
+        """Position of the last bar at or before `when` (a bar position or anything pd.Timestamp accepts)."""
+        if isinstance(when, (int, np.integer)):
+            bar = int(when)
+        else:
+            bar = int(self.index.searchsorted(pd.Timestamp(when), side='right')) - 1
+        if not 0 <= bar < len(self.index):
+            raise ValueError(f"{when} is outside the data ({self.index[0].date()} to {self.index[-1].date()})")
+        return bar
+
+    def _checkpoint(self, bar):
+        """(bar, state) of the last snapshot at or before bar."""
+        k = int(np.searchsorted(self.checkpoint_bars, bar, side='right')) - 1
+        row = self.trackers[k]
+        state = tuple(row[name].item() for name in SIGNAL_STATE_FIELDS)
+        buys = tuple(self.buy_prices[self.buy_offsets[k]:self.buy_offsets[k + 1]].tolist())
+        return int(self.checkpoint_bars[k]), state + (buys,)
+
+    def state_at(self, when):
+        """Evaluator state after the bar at `when` (what the strategy knew at that close)."""
+        bar = self.bar_at(when)
+        start, state = self._checkpoint(bar)
+        _, state, _, _ = self._run(state=state, start=start, stop=bar + 1)
+        return state_dict(state)
+
+    def indicators_at(self, when):
+        bar = self.bar_at(when)
+        return {name: self.inputs[key][bar] if self.inputs[key] is not None else None
+                for name, key in INDICATORS.items()}
+
+    def explain(self, when):
+        """Replays up to the bar at `when` and returns its inputs, state and buy/sell decisions."""
+        bar = self.bar_at(when)
+        start, state = self._checkpoint(bar)
+        _, state, _, trace = self._run(state=state, start=start, stop=bar + 1, trace_bar=bar)
+        return {
+            'bar': bar,
+            'date': self.index[bar],
+            'replayed_bars': bar + 1 - start,
+            'indicators': self.indicators_at(bar),
+            'state_before': state_dict(trace['state_before']),
+            'state_after': state_dict(state),
+            **{k: v for k, v in trace.items() if k != 'state_before'},
+        }
+
+def state_dict(state):
+    """Evaluator state tuple -> {field: value, 'active_buys': [...]}."""
+    out = dict(zip(SIGNAL_STATE_FIELDS, state[:-1]))
+    out['active_buys'] = list(state[-1])
+    return out
+
+def _since(bar, tracker):
+    return "none pending" if tracker == -999 else f"{bar - tracker} bars ago"
+
+def same_state(a, b):
+    """State dict equality with NaN == NaN (ema_ext_at_oversold is NaN before EMA200 exists)."""
+    return (np.array_equal([a[f] for f in SIGNAL_STATE_FIELDS], [b[f] for f in SIGNAL_STATE_FIELDS], equal_nan=True)
+            and a['active_buys'] == b['active_buys'])
+
+def format_explanation(exp, replay):
+    """Readable answer to 'why did / didn't it fire on this bar'."""
+    bar = exp['bar']
+    ind = exp['indicators']
+    before = exp['state_before']
+    after = exp['state_after']
+    lines = [f"=== {replay.timeframe_name} {exp['date'].date()} (bar {bar}, replayed {exp['replayed_bars']} bars) ==="]
+    lines.append(f"close {ind['close']:.2f} | RSI {ind['RSI']:.1f} | EMA200 {ind['EMA200']:.2f} | "
+                 f"EMA ext {ind['EMA_Ext_Pct']:+.1f}% | Stoch(18) {ind['Stoch_K_18']:.1f}")
+    lines.append(f"Stoch bull cross {bool(ind['Stoch_Bull_Cross'])} | bear cross {bool(ind['Stoch_Bear_Cross'])} | "
+                 f"below EMA21 {bool(ind['Below_EMA21'])} | below EMA200 {bool(ind['Below_EMA200'])}")
+
+    # Buy side
+    if exp['bought']:
+        lines.append("BUY fired")
+    elif exp['buy_setup']:
+        lines.append(f"Buy setup present but blocked: {BLOCK_REASONS[exp['buy_blocked']]}")
+    elif replay.timeframe_name == "Weekly":
+        lines.append("No buy setup (needs close < EMA200/EMA100, Stoch(18) < 9 and RSI < 35)")
+    else:
+        lines.append(f"No buy setup: RSI < 35 {_since(bar, after['rsi_oversold_bar'])}, "
+                     f"qualifying Stoch bull cross {_since(bar, after['stoch_bull_bar'])} (needs <= 20)")
+
+    # Sell side
+    if exp['sold']:
+        lines.append(f"SELL fired ({SELL_RULES[exp['sell_rule']]})")
+    elif exp['sell_rule']:
+        lines.append(f"Sell rule '{exp['sell_rule']}' matched but blocked: {BLOCK_REASONS[exp['sell_blocked']]}")
+    elif replay.timeframe_name == "Weekly":
+        lines.append("No sell rule matched (" + SELL_RULES['weekly'] + ")")
+    else:
+        lines.append(f"No sell rule matched: RSI > threshold {_since(bar, after['rsi_strong_overbought_bar'])}, "
+                     f"Stoch bear cross {_since(bar, after['stoch_bear_bar_weak'])}")
+
+    buys = before['active_buys']
+    if buys:
+        avg = sum(buys) / len(buys)
+        lines.append(f"Open buys before bar: {len(buys)} (avg {avg:.2f}, min sell price "
+                     f"{avg * (1 + replay.min_profit_pct):.2f}) | last sell {_since(bar, before['last_sell_idx'])}")
+    else:
+        lines.append(f"No open buys before bar | last sell {_since(bar, before['last_sell_idx'])}")
+    return "\n".join(lines)
+
+def verify_replay(replay, samples=200, seed=0):
+    """Compares replayed state with a full rerun at random bars; returns (all match, replay s, rerun s)."""
+    rng = np.random.default_rng(seed)
+    bars = rng.integers(0, len(replay.index), size=samples)
+    ok = True
+    replay_time = rerun_time = 0.0
+    for bar in bars.tolist():
+        start = time.perf_counter()
+        replayed = replay.state_at(bar)
+        replay_time += time.perf_counter() - start
+        start = time.perf_counter()
+        _, state, _, _ = replay._run(stop=bar + 1)
+        rerun_time += time.perf_counter() - start
+        ok &= same_state(replayed, state_dict(state))
+    return ok, replay_time / samples, rerun_time / samples
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain detect_signals decisions at given dates.")
+    parser.add_argument("dates", nargs="*", default=["2024-12-10"], help="Dates to explain (YYYY-MM-DD)")
+    parser.add_argument("--timeframe", choices=["Daily", "Weekly"], default="Daily")
+    parser.add_argument("--rsi-sell", type=float, default=70)
+    parser.add_argument("--min-profit", type=float, default=0.25)
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY)
+    parser.add_argument("--verify", action="store_true", help="Check replays against full reruns and time both")
+    args = parser.parse_args()
+    if args.checkpoint_every < 1:
+        parser.error("--checkpoint-every must be at least 1")
+
+    df = load_and_clean_data(DAILY_FILE if args.timeframe == "Daily" else WEEKLY_FILE)
+    if df is None: return
+
+    start = time.perf_counter()
+    replay = SignalReplay(df, args.timeframe, rsi_sell_thresh=args.rsi_sell, min_profit_pct=args.min_profit,
+                          checkpoint_every=args.checkpoint_every)
+    print(f"Recorded {len(replay.checkpoint_bars)} snapshots ({replay.nbytes()} bytes) over {len(df)} bars "
+          f"in {(time.perf_counter() - start)*1000:.1f}ms")
+
+    for date in args.dates:
+        print()
+        print(format_explanation(replay.explain(date), replay))
+
+    if args.verify:
+        ok, replay_time, rerun_time = verify_replay(replay)
+        print(f"\nReplay matches full rerun: {ok} | replay {replay_time*1e6:.0f}us vs rerun {rerun_time*1e6:.0f}us per query")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+import pandas as pd
+import numpy as np
+import argparse
+import io
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from analysis_eth import DATA_DIR, calculate_indicators, detect_signals
+from event_backtest import run_event_backtest
+
+# File name suffix -> timeframe name used by detect_signals
+TIMEFRAMES = {"1D": "Daily", "1W": "Weekly"}
+
+# Query parameter -> (detect_signals argument, type, default)
+SIGNAL_PARAMS = {
+    'rsi_buy': ('rsi_buy_thresh', float, 40),
+    'rsi_sell': ('rsi_sell_thresh', float, 70),
+    'min_profit': ('min_profit_pct', float, 0.25),
+}
+
+# Order types understood by run_event_backtest
+ORDER_TYPES = ('market', 'limit')
+
+# Stoch window used by calculate_indicators
+STOCH_WINDOW = 18
+
+def discover_datasets(data_dir=DATA_DIR):
+    """Maps (symbol, timeframe) to CSV paths for files named like 'CRYPTO_ETHUSD, 1D.csv'."""
+    datasets = {}
+    for name in os.listdir(data_dir):
+        m = re.match(r'^[A-Z]+_(\w+), (\w+)\.csv$', name)
+        if m and m.group(2) in TIMEFRAMES:
+            datasets[(m.group(1), TIMEFRAMES[m.group(2)])] = os.path.join(data_dir, name)
+    return datasets
+
+def extend_indicators(df, n_old):
+    """
+    Updates EMA100 and Stoch_K_18 (see calculate_indicators) for rows appended after n_old,
+    continuing the EMA recursion instead of recomputing the whole history.
+    """
+    close = df['close'].to_numpy(dtype=float)
+    ema = df['EMA100'].to_numpy(dtype=float).copy()
+    alpha = 2.0 / (100 + 1)
+    for i in range(n_old, len(df)):
+        ema[i] = close[i] if i == 0 else alpha * close[i] + (1 - alpha) * ema[i - 1]
+    df['EMA100'] = ema
+
+    # Only the tail needs the rolling window
+    start = max(n_old - STOCH_WINDOW + 1, 0)
+    tail = df.iloc[start:]
+    low_18 = tail['low'].rolling(window=STOCH_WINDOW).min()
+    high_18 = tail['high'].rolling(window=STOCH_WINDOW).max()
+    stoch = (100 * (tail['close'] - low_18) / (high_18 - low_18)).to_numpy()
+    values = df['Stoch_K_18'].to_numpy(dtype=float).copy()
+    values[n_old:] = stoch[n_old - start:]
+    df['Stoch_K_18'] = values
+    return df
+
+class Dataset:
+    """A loaded CSV kept in memory, refreshed incrementally when rows are appended."""
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.df = None
+        self.columns = None
+        self.offset = 0     # bytes of the file already parsed
+        self.version = 0    # bumped whenever df changes
+        self.polled_size = -1  # file size seen by the previous refresh()
+        self.lock = threading.Lock()
+
+    def _full_load(self):
+        # Parse exactly the bytes read here, so rows appended meanwhile are picked up by refresh()
+        with open(self.filepath, 'rb') as f:
+            data = f.read()
+        header_end = data.find(b'\n') + 1
+        self.columns = data[:header_end].decode().strip().split(',')
+        complete = data[:header_end] + self._complete_rows(data[header_end:], allow_unterminated=True)
+        df = pd.read_csv(io.BytesIO(complete))
+        df['datetime'] = pd.to_datetime(df['time'], unit='s')
+        df.set_index('datetime', inplace=True)
+        self.df = calculate_indicators(df)
+        self.offset = len(complete)
+        self.polled_size = len(data)
+        self.version += 1
+
+    def _complete_rows(self, new_bytes, allow_unterminated):
+        """
+        Leading part of new_bytes made of whole rows (a partially written row is left for later).
+        An unterminated last row is only taken when allow_unterminated is set: its comma count
+        cannot tell whether the writer is still in the middle of the last field.
+        """
+        tail = new_bytes[new_bytes.rfind(b'\n') + 1:]
+        if allow_unterminated and tail.count(b',') == len(self.columns) - 1:
+            # Unterminated but complete row (exports often omit the final newline)
+            return new_bytes
+        return new_bytes[:len(new_bytes) - len(tail)]
+
+    def refresh(self):
+        """Picks up appended rows. Returns (DataFrame, version) as one consistent snapshot."""
+        with self.lock:
+            if self.df is None:
+                self._full_load()
+                return self.df, self.version
+
+            size = os.path.getsize(self.filepath)
+            if size < self.offset:
+                # File was rewritten, not appended to
+                self._full_load()
+                return self.df, self.version
+            if size == self.offset:
+                return self.df, self.version
+
+            # An unterminated row is only trusted once the file size is unchanged across two polls
+            settled = size == self.polled_size
+            self.polled_size = size
+            with open(self.filepath, 'rb') as f:
+                f.seek(self.offset)
+                new_bytes = f.read(size - self.offset)
+            complete = self._complete_rows(new_bytes, allow_unterminated=settled)
+            if not complete.strip():
+                return self.df, self.version
+
+            new = pd.read_csv(io.BytesIO(complete), header=None, names=self.columns)
+            self.offset += len(complete)
+            # Drop rows that do not extend the series (e.g. the remainder of a row split by a writer)
+            times = new['time'].to_numpy(dtype=float)
+            previous = np.fmax.accumulate(np.concatenate([[self.df['time'].iloc[-1]], times[:-1]]))
+            new = new[times > previous]
+            if new.empty:
+                return self.df, self.version
+            new['datetime'] = pd.to_datetime(new['time'], unit='s')
+            new.set_index('datetime', inplace=True)
+            n_old = len(self.df)
+            df = pd.concat([self.df, new])
+            self.df = extend_indicators(df, n_old)
+            self.version += 1
+            return self.df, self.version
+
+class ResultCache:
+    """Small thread-safe LRU cache."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self.lock:
+            if key in self.data:
+                self.data.move_to_end(key)
+                self.hits += 1
+                return self.data[key]
+            self.misses += 1
+        value = compute()
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+        return value
+
+class SignalService:
+    """Answers signal / latest-state / backtest queries against resident datasets."""
+
+    def __init__(self, data_dir=DATA_DIR, cache_size=256):
+        self.datasets = {key: Dataset(path) for key, path in discover_datasets(data_dir).items()}
+        self.cache = ResultCache(cache_size)
+
+    def _dataset(self, query):
+        symbol = query.get('symbol', 'ETHUSD').upper()
+        timeframe = query.get('timeframe', 'Daily').capitalize()
+        ds = self.datasets.get((symbol, timeframe))
+        if ds is None:
+            raise KeyError(f"Unknown dataset {symbol}/{timeframe}")
+        df, version = ds.refresh()
+        return ds, df, version, symbol, timeframe
+
+    @staticmethod
+    def _params(query):
+        return {arg: cast(query.get(name, default)) for name, (arg, cast, default) in SIGNAL_PARAMS.items()}
+
+    def _signals(self, ds, df, version, timeframe, params):
+        # version comes from the same refresh() as df, so a result is never cached under a newer version
+        key = ('signals', ds.filepath, version, tuple(sorted(params.items())))
+        return self.cache.get_or_compute(
+            key, lambda: detect_signals(df, timeframe, compact=True, **params)[1])
+
+    def signals(self, query):
+        ds, df, version, symbol, timeframe = self._dataset(query)
+        params = self._params(query)
+        signals = self._signals(ds, df, version, timeframe, params)
+        return {
+            'symbol': symbol, 'timeframe': timeframe, 'params': params,
+            'signals': [{'date': str(s['date'].date()), 'type': s['type'], 'price': float(s['price'])}
+                        for s in signals],
+        }
+
+    def latest(self, query):
+        ds, df, version, symbol, timeframe = self._dataset(query)
+        params = self._params(query)
+        signals = self._signals(ds, df, version, timeframe, params)
+        last = df.iloc[-1]
+        prev = df.iloc[-2] if len(df) > 1 else last
+        ext = (last['close'] - last['EMA200']) / last['EMA200'] * 100
+        return {
+            'symbol': symbol, 'timeframe': timeframe,
+            'date': str(df.index[-1].date()),
+            'close': float(last['close']),
+            'RSI': float(last['RSI']),
+            'EMA200': float(last['EMA200']),
+            'EMA_Ext_Pct': float(ext),
+            'Stoch_Bull_Cross': bool(last['%K'] > last['%D'] and prev['%K'] <= prev['%D']),
+            'Stoch_Bear_Cross': bool(last['%K'] < last['%D'] and prev['%K'] >= prev['%D']),
+            'last_signal': ({'date': str(signals[-1]['date'].date()), 'type': signals[-1]['type'],
+                             'price': float(signals[-1]['price'])} if signals else None),
+        }
+
+    def backtest(self, query):
+        ds, df, version, symbol, timeframe = self._dataset(query)
+        params = self._params(query)
+        order_type = query.get('order_type', 'market')
+        if order_type not in ORDER_TYPES:
+            raise ValueError(f"order_type must be one of {ORDER_TYPES}")
+        key = ('backtest', ds.filepath, version, tuple(sorted(params.items())), order_type)
+
+        def compute():
+            signals = self._signals(ds, df, version, timeframe, params)
+            r = run_event_backtest(df, signals, order_type=order_type)
+            return {
+                'symbol': symbol, 'timeframe': timeframe, 'params': params, 'order_type': order_type,
+                'final_value': float(r['final_value']),
+                'total_return': float(r['total_return']),
+                'max_drawdown': float(r['max_drawdown']),
+                'fees_paid': float(r['fees_paid']),
+                'slippage_cost': float(r['slippage_cost']),
+                'fills': r['fills'],
+                'closed_lots': len(r['trades']),
+            }
+        return self.cache.get_or_compute(key, compute)
+
+    def status(self, query):
+        return {
+            'datasets': {f"{s}/{t}": {'rows': 0 if ds.df is None else len(ds.df), 'version': ds.version}
+                         for (s, t), ds in self.datasets.items()},
+            'cache': {'size': len(self.cache.data), 'hits': self.cache.hits, 'misses': self.cache.misses},
+        }
+
+def make_handler(service):
+    routes = {
+        '/signals': service.signals,
+        '/latest': service.latest,
+        '/backtest': service.backtest,
+        '/status': service.status,
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            route = routes.get(url.path)
+            if route is None:
+                return self._send(404, {'error': f"Unknown path {url.path}", 'paths': sorted(routes)})
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                return self._send(200, route(query))
+            except (KeyError, ValueError) as e:
+                return self._send(400, {'error': str(e)})
+
+        def _send(self, code, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+def serve(host="127.0.0.1", port=8765, cache_size=256):
+    service = SignalService(cache_size=cache_size)
+    # Load everything up front so the first request is already hot
+    for ds in service.datasets.values():
+        ds.refresh()
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving {len(service.datasets)} datasets on http://{host}:{port} (/signals, /latest, /backtest, /status)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local signal query service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.cache_size)
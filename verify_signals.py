@@ -1,6 +1,27 @@
 import pandas as pd
+import numpy as np
+import argparse
+import json
 import os
-from analysis_eth import detect_signals, load_and_clean_data, DAILY_FILE, WEEKLY_FILE
+import re
+from analysis_eth import detect_signals, load_and_clean_data, DAILY_FILE, WEEKLY_FILE, BAD_BUY_ZONES
+from pivot_scoring import score_signals, print_score
+
+# Golden signal snapshots, one JSON file per (dataset, timeframe, params)
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "golden")
+
+# Configurations checked by the regression run: (dataset, timeframe, detect_signals params)
+REGRESSION_CONFIGS = [
+    (DAILY_FILE, "Daily", {'rsi_buy_thresh': 40, 'rsi_sell_thresh': 70, 'min_profit_pct': 0.25}),
+    (DAILY_FILE, "Daily", {'rsi_buy_thresh': 40, 'rsi_sell_thresh': 80, 'min_profit_pct': 0.5}),
+    (DAILY_FILE, "Daily", {'rsi_buy_thresh': 40, 'rsi_sell_thresh': 75, 'min_profit_pct': 0.15}),
+    (DAILY_FILE, "Daily", {'rsi_buy_thresh': 40, 'rsi_sell_thresh': 70, 'min_profit_pct': 0.0}),
+    (WEEKLY_FILE, "Weekly", {'rsi_buy_thresh': 40, 'rsi_sell_thresh': 75, 'min_profit_pct': 0.25}),
+]
+
+# Strategy constraints asserted on every configuration
+BUY_DEBOUNCE_BARS = 5
+SELL_SPACING_BARS = 20
 
 def verify():
     print("Verifying Signals...")
@@ -9,7 +30,7 @@ def verify():
     print("\n--- DAILY SIGNALS ---")
     df = load_and_clean_data(DAILY_FILE)
     if df is not None:
-        df, signals = detect_signals(df, "Daily", rsi_buy_thresh=40, rsi_sell_thresh=70, min_profit_pct=0.25)
+        _, signals = detect_signals(df, "Daily", rsi_buy_thresh=40, rsi_sell_thresh=70, min_profit_pct=0.25, compact=True)
         
         sig_df = pd.DataFrame(signals)
         if not sig_df.empty:
@@ -39,16 +60,199 @@ def verify():
                      for _, row in sells.iterrows():
                          print(f"   {row['type']} at {row['price']:.2f} on {row['date'].date()}")
 
+        print_score(score_signals(df, signals, "Daily"), "Daily")
+
     # --- WEEKLY ---
     print("\n--- WEEKLY SIGNALS ---")
     df_weekly = load_and_clean_data(WEEKLY_FILE)
     if df_weekly is not None:
-        df_weekly, signals_weekly = detect_signals(df_weekly, "Weekly", rsi_buy_thresh=40, rsi_sell_thresh=75, min_profit_pct=0.25)
+        _, signals_weekly = detect_signals(df_weekly, "Weekly", rsi_buy_thresh=40, rsi_sell_thresh=75, min_profit_pct=0.25, compact=True)
         print(f"Detected {len([s for s in signals_weekly if s['type']=='Buy'])} Buy and {len([s for s in signals_weekly if s['type']=='Sell'])} Sell signals for Weekly")
         
         print("All Weekly Signals:")
         for s in signals_weekly:
              print(f"{s['date'].date()} | {s['type']} | {s['price']:.2f}")
 
+        print_score(score_signals(df_weekly, signals_weekly, "Weekly"), "Weekly")
+
+def golden_path(filepath, timeframe_name, params):
+    """Snapshot file for a (dataset, timeframe, params) combination."""
+    dataset = re.sub(r'[^A-Za-z0-9]+', '_', os.path.splitext(os.path.basename(filepath))[0]).strip('_')
+    param_str = "_".join(f"{k}{v}" for k, v in sorted(params.items()))
+    return os.path.join(GOLDEN_DIR, f"{dataset}_{timeframe_name}_{param_str}.json")
+
+def run_configs(configs):
+    """
+    Runs detect_signals for every configuration (each dataset is loaded once).
+
+    Returns (runs, flat): per-config dicts with sorted buy/sell 'time' arrays, and one flat
+    dict of arrays holding every signal of every config for the vectorized constraint checks.
+    """
+    frames = {}
+    runs = []
+    cols = {'config': [], 'loc': [], 'is_buy': [], 'price': [], 'time': []}
+
+    for c, (filepath, timeframe_name, params) in enumerate(configs):
+        if filepath not in frames:
+            frames[filepath] = load_and_clean_data(filepath)
+        df = frames[filepath]
+        if df is None:
+            runs.append(None)
+            continue
+
+        _, signals = detect_signals(df, timeframe_name, compact=True, **params)
+        locs = np.array([s['index_loc'] for s in signals], dtype=np.int64)
+        is_buy = np.array([s['type'] == 'Buy' for s in signals], dtype=bool)
+        times = df['time'].to_numpy(dtype=np.int64)[locs]
+
+        runs.append({'buy_times': np.sort(times[is_buy]), 'sell_times': np.sort(times[~is_buy])})
+        cols['config'].append(np.full(len(locs), c, dtype=np.int64))
+        cols['loc'].append(locs)
+        cols['is_buy'].append(is_buy)
+        cols['price'].append(np.array([s['price'] for s in signals], dtype=float))
+        cols['time'].append(times)
+
+    flat = {k: (np.concatenate(v) if v else np.empty(0)) for k, v in cols.items()}
+    flat['is_buy'] = flat['is_buy'].astype(bool)
+    return runs, flat
+
+def check_constraints(configs, flat):
+    """
+    Asserts the strategy constraints over all signals of all configs in one vectorized pass.
+
+    Signals must be in emission order within each config (as returned by run_configs).
+    Returns {constraint name: bool array of violating signals}.
+    """
+    config = flat['config']
+    loc = flat['loc']
+    is_buy = flat['is_buy']
+    price = flat['price']
+    n = len(loc)
+    timeframes = np.array([tf for _, tf, _ in configs])
+    min_profit = np.array([p.get('min_profit_pct', 0.0) for _, _, p in configs])
+
+    # First signal of each config has no predecessor
+    first = np.ones(n, dtype=bool)
+    first[1:] = config[1:] != config[:-1]
+
+    # 1. No buys inside the exclusion zones (Daily only)
+    days = pd.to_datetime(flat['time'], unit='s').normalize()
+    in_zone = np.zeros(n, dtype=bool)
+    for start, end in BAD_BUY_ZONES:
+        in_zone |= np.asarray((days >= start) & (days <= end))
+    excluded_buy = is_buy & in_zone & (timeframes[config] == "Daily")
+
+    # 2. Buy debounce: more than 5 bars after the previous signal of any type
+    gap_prev = np.empty(n, dtype=np.int64)
+    gap_prev[1:] = loc[1:] - loc[:-1]
+    gap_prev[first] = np.iinfo(np.int64).max
+    buy_debounce = is_buy & (gap_prev <= BUY_DEBOUNCE_BARS)
+
+    # 3. Sell spacing: more than 20 bars between consecutive sells of a config
+    sell_pos = np.flatnonzero(~is_buy)
+    sell_spacing = np.zeros(n, dtype=bool)
+    if len(sell_pos) > 1:
+        same_config = config[sell_pos[1:]] == config[sell_pos[:-1]]
+        too_close = (loc[sell_pos[1:]] - loc[sell_pos[:-1]]) <= SELL_SPACING_BARS
+        sell_spacing[sell_pos[1:][same_config & too_close]] = True
+
+    # 4. Min profit: a sell closing a position must be >= avg entry * (1 + min_profit)
+    # A cycle is the run of buys since the previous sell of the same config
+    sells_before = np.cumsum(~is_buy) - (~is_buy)
+    cycle = np.unique(np.stack([config, sells_before], axis=1), axis=0, return_inverse=True)[1].ravel()
+    buy_sum = np.bincount(cycle, weights=np.where(is_buy, price, 0.0), minlength=cycle.max() + 1 if n else 0)
+    buy_cnt = np.bincount(cycle, weights=is_buy.astype(float), minlength=cycle.max() + 1 if n else 0)
+    has_position = (~is_buy) & (buy_cnt[cycle] > 0)
+    avg_entry = np.divide(buy_sum[cycle], buy_cnt[cycle], out=np.zeros(n), where=has_position)
+    required = avg_entry * (1 + min_profit[config])
+    min_profit_violation = has_position & (min_profit[config] > 0) & (price < required * (1 - 1e-12))
+
+    return {
+        'buy_in_exclusion_zone': excluded_buy,
+        'buy_debounce': buy_debounce,
+        'sell_spacing': sell_spacing,
+        'sell_min_profit': min_profit_violation,
+    }
+
+def diff_signals(golden, current):
+    """Added / removed signal times per type, using sorted-array set operations."""
+    diff = {}
+    for key in ('buy_times', 'sell_times'):
+        old = np.asarray(golden[key], dtype=np.int64)
+        new = current[key]
+        diff[key] = {
+            'added': np.setdiff1d(new, old, assume_unique=True),
+            'removed': np.setdiff1d(old, new, assume_unique=True),
+        }
+    return diff
+
+def save_golden(path, filepath, timeframe_name, params, run):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    snapshot = {
+        'dataset': os.path.basename(filepath),
+        'timeframe': timeframe_name,
+        'params': params,
+        'buy_times': run['buy_times'].tolist(),
+        'sell_times': run['sell_times'].tolist(),
+    }
+    with open(path, "w") as f:
+        json.dump(snapshot, f, indent=1)
+
+def verify_regression(configs=REGRESSION_CONFIGS, update_golden=False):
+    """
+    Runs every configuration, checks the constraints and diffs against the golden snapshots.
+    Returns True when everything passes.
+    """
+    print(f"Running {len(configs)} configurations...")
+    runs, flat = run_configs(configs)
+    ok = True
+
+    print("\n--- CONSTRAINTS ---")
+    violations = check_constraints(configs, flat)
+    for name, bad in violations.items():
+        status = "PASS" if not bad.any() else f"FAIL ({bad.sum()} signals)"
+        print(f"{name:<24} {status}")
+        for i in np.flatnonzero(bad):
+            _, timeframe_name, params = configs[flat['config'][i]]
+            date = pd.to_datetime(flat['time'][i], unit='s').date()
+            print(f"   {timeframe_name} {params}: {'Buy' if flat['is_buy'][i] else 'Sell'} on {date}")
+        ok &= not bad.any()
+
+    print("\n--- GOLDEN SNAPSHOTS ---")
+    for (filepath, timeframe_name, params), run in zip(configs, runs):
+        if run is None:
+            ok = False
+            continue
+        path = golden_path(filepath, timeframe_name, params)
+        label = f"{timeframe_name} {params}"
+        if update_golden:
+            save_golden(path, filepath, timeframe_name, params, run)
+            print(f"{label}: snapshot written to {os.path.relpath(path)}")
+            continue
+        if not os.path.exists(path):
+            print(f"{label}: MISSING {os.path.relpath(path)} (run with --update-golden)")
+            ok = False
+            continue
+
+        with open(path) as f:
+            golden = json.load(f)
+        diff = diff_signals(golden, run)
+        changed = any(len(d['added']) or len(d['removed']) for d in diff.values())
+        print(f"{label}: {'CHANGED' if changed else 'MATCH'}")
+        for key, d in diff.items():
+            for change in ('added', 'removed'):
+                for t in d[change]:
+                    print(f"   {change} {key[:-6]} on {pd.to_datetime(t, unit='s').date()}")
+        ok &= not changed
+
+    print(f"\nRegression: {'PASS' if ok else 'FAIL'}")
+    return ok
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify signals against known dates and golden snapshots.")
+    parser.add_argument("--regression", action="store_true", help="Check constraints and golden snapshots")
+    parser.add_argument("--update-golden", action="store_true", help="Rewrite the golden snapshots")
+    args = parser.parse_args()
+    if args.regression or args.update_golden:
+        raise SystemExit(0 if verify_regression(update_golden=args.update_golden) else 1)
     verify()